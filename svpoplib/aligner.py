@@ -22,6 +22,15 @@ SOURCE_ALN = 1
 SOURCE_GAP_SUB = 2
 SOURCE_GAP_QRY = 3
 
+# Minimum sequence length for aligning by anti-diagonals in ScoreAligner.score_align()
+ALIGN_DIAG_MIN_LEN = 200
+
+# 2-bit base codes for packed k-mers (indexed by ASCII value, 255 for bases other than A, C, G, and T)
+KMER_BASE_CODE = np.full(256, 255, dtype=np.uint8)
+
+for _code, _base in enumerate(b'ACGT'):
+    KMER_BASE_CODE[_base] = _code
+
 
 class ScoreTraceNode:
     def __init__(self, op_code=OP_NONE, score=0):
@@ -44,6 +53,41 @@ def get_kmer_count(seq, k_size):
     return counter
 
 
+def get_kmer_code_count(seq, k_size):
+    """
+    Get k-mer counts for a sequence with each k-mer packed into an integer (2 bits per base).
+
+    :param seq: Sequence (string).
+    :param k_size: K-mer size (at most 32 for packed k-mers).
+
+    :return: A tuple of two arrays, sorted k-mer codes and the count for each k-mer, or `None` if the sequence
+        contains bases other than A, C, G, and T or `k_size` cannot be packed.
+    """
+
+    if k_size < 1 or k_size > 32:
+        return None
+
+    seq = seq.strip().upper()
+
+    base_code = KMER_BASE_CODE[np.frombuffer(seq.encode(), dtype=np.uint8)]
+
+    if np.any(base_code == 255):
+        return None
+
+    n_kmer = len(base_code) - k_size + 1
+
+    if n_kmer < 1:
+        return np.array([], dtype=np.uint64), np.array([], dtype=np.int64)
+
+    # Pack k-mers (one shift and add for each base position in the k-mer)
+    kmer_code = np.zeros(n_kmer, dtype=np.uint64)
+
+    for index in range(k_size):
+        kmer_code = (kmer_code << np.uint64(2)) | base_code[index:index + n_kmer]
+
+    return np.unique(kmer_code, return_counts=True)
+
+
 def jaccard_distance(seq_a, seq_b, k_size):
     """
     Get the Jaccard distance between k-merized sequences. This Jaccard distance is computed on the total number of
@@ -57,6 +101,24 @@ def jaccard_distance(seq_a, seq_b, k_size):
     :return: Jaccard distance account for multiplicity.
     """
 
+    # Packed k-mers
+    kmer_a = get_kmer_code_count(seq_a, k_size)
+    kmer_b = get_kmer_code_count(seq_b, k_size)
+
+    if kmer_a is not None and kmer_b is not None:
+        code_a, count_a = kmer_a
+        code_b, count_b = kmer_b
+
+        if len(code_a) == 0 or len(code_b) == 0:
+            return 0
+
+        _, index_a, index_b = np.intersect1d(code_a, code_b, assume_unique=True, return_indices=True)
+
+        n_match = np.sum(np.minimum(count_a[index_a], count_b[index_b]))  # Matching k-mers
+
+        return n_match / (np.sum(count_a) + np.sum(count_b) - n_match)  # All k-mers (sum of max counts)
+
+    # K-mers as strings (bases other than A, C, G, and T)
     count1 = get_kmer_count(seq_a, k_size)
     count2 = get_kmer_count(seq_b, k_size)
 
@@ -161,13 +223,29 @@ class ScoreAligner:
         :return: Maximum alignment score.
         """
 
-        # Compute for convenience
-        gap_1bp = self.__gap_o + self.__gap_e
-
         # Scrub sequences
         seq_a = seq_a.upper().strip()
         seq_b = seq_b.upper().strip()
 
+        # Align by anti-diagonals for longer sequences (numpy overhead per diagonal exceeds the cost of short alignments)
+        if min(len(seq_a), len(seq_b)) >= ALIGN_DIAG_MIN_LEN:
+            return self.__score_align_batch(seq_a, [seq_b])[0]
+
+        return self.__score_align_cell(seq_a, seq_b)
+
+    def __score_align_cell(self, seq_a, seq_b):
+        """
+        Get max score aligning two scrubbed sequences one cell at a time.
+
+        :param seq_a: Subject sequence.
+        :param seq_b: Query sequence.
+
+        :return: Maximum alignment score.
+        """
+
+        # Compute for convenience
+        gap_1bp = self.__gap_o + self.__gap_e
+
         # Get length
         len_a = len(seq_a) + 1
         len_b = len(seq_b) + 1
@@ -231,6 +309,137 @@ class ScoreAligner:
 
         return global_max_score
 
+    def __score_align_batch(self, seq_a, seq_b_list):
+        """
+        Get max scores aligning one scrubbed subject sequence to several scrubbed query sequences. All alignments are
+        computed together by anti-diagonals with one row per query sequence (shorter query sequences are padded and
+        padded cells are excluded from the max score). Returns the same scores as `__score_align_cell()`.
+
+        :param seq_a: Subject sequence.
+        :param seq_b_list: List of query sequences.
+
+        :return: Numpy array of maximum alignment scores (one for each query sequence).
+        """
+
+        # Compute for convenience
+        gap_1bp = self.__gap_o + self.__gap_e
+
+        n_seq = len(seq_b_list)
+
+        seq_a = np.frombuffer(seq_a.encode(), dtype=np.uint8)
+        seq_b_len = np.array([len(seq_b) for seq_b in seq_b_list])
+
+        # Get length
+        len_a = len(seq_a) + 1
+        len_b = np.max(seq_b_len) + 1
+
+        # Query sequences padded with 0 (never matches a base) and reversed
+        seq_b_rev = np.zeros((n_seq, len_b - 1), dtype=np.uint8)
+
+        for index in range(n_seq):
+            seq_b_rev[index, :seq_b_len[index]] = np.frombuffer(seq_b_list[index].encode(), dtype=np.uint8)
+
+        seq_b_rev = seq_b_rev[:, ::-1]
+
+        # Score and op code for cells on the last three anti-diagonals (indexed by the position in seq_a). Each cell
+        # depends only on cells in the two previous anti-diagonals, so all cells in one anti-diagonal are computed
+        # together. Buffers are rotated, cells outside the range of a diagonal are never read after they are written.
+        score_buf = [np.zeros((n_seq, len_a)) for i in range(3)]
+        op_buf = [np.zeros((n_seq, len_a), dtype=np.int8) for i in range(3)]
+
+        # Base alignment scores (indexed by match)
+        align_score = np.array([self.__mismatch, self.__match])
+        align_op = np.array([OP_MISMATCH, OP_MATCH], dtype=np.int8)
+
+        # Max values
+        global_max_score = np.zeros(n_seq)  # Max score
+
+        # Iterate anti-diagonals (i + j)
+        for diag in range(2, len_a + len_b - 1):
+
+            score_diag, score_last, score_last2 = score_buf[diag % 3], score_buf[(diag - 1) % 3], score_buf[(diag - 2) % 3]
+            op_diag, op_last = op_buf[diag % 3], op_buf[(diag - 1) % 3]
+
+            # Range of seq_a positions (i) on this diagonal
+            i_min = max(1, diag - len_b + 1)
+            i_max = min(len_a - 1, diag - 1)
+
+            # Aligned bases (seq_a[i - 1] vs seq_b[j - 1] with j = diag - i)
+            is_match = (
+                seq_a[i_min - 1:i_max] == seq_b_rev[:, len_b - 1 - diag + i_min:len_b - diag + i_max]
+            ).view(np.uint8)
+
+            score_max = score_last2[:, i_min - 1:i_max] + align_score[is_match]
+            op_code = align_op[is_match]
+
+            # Gap subject (insertion)
+            score_gap_sub = score_last[:, i_min:i_max + 1] + np.where(
+                op_last[:, i_min:i_max + 1] == OP_GAP_SUB, self.__gap_e, gap_1bp
+            )
+
+            is_gap = score_gap_sub > score_max
+
+            score_max[is_gap] = score_gap_sub[is_gap]
+            op_code[is_gap] = OP_GAP_SUB
+
+            # Gap query (deletion)
+            score_gap_qry = score_last[:, i_min - 1:i_max] + np.where(
+                op_last[:, i_min - 1:i_max] == OP_GAP_QRY, self.__gap_e, gap_1bp
+            )
+
+            is_gap = score_gap_qry > score_max
+
+            score_max[is_gap] = score_gap_qry[is_gap]
+            op_code[is_gap] = OP_GAP_SUB
+
+            # Update trace matrix
+            is_pos = score_max > 0
+
+            score_max[~ is_pos] = 0.0
+            op_code[~ is_pos] = OP_NONE
+
+            score_diag[:, i_min:i_max + 1] = score_max
+            op_diag[:, i_min:i_max + 1] = op_code
+
+            # Check for new global max (cells in query sequence padding are not counted)
+            is_max = (op_code == OP_MATCH) & (
+                np.arange(diag - i_min, diag - i_max - 1, -1) <= seq_b_len[:, np.newaxis]
+            )
+
+            if is_max.any():
+                global_max_score = np.maximum(
+                    global_max_score,
+                    np.max(score_max, axis=1, where=is_max, initial=0.0)
+                )
+
+        return global_max_score
+
+    def __align_prop(self, score, len_a, len_b, rotate):
+        """
+        Get the alignment score proportion from an alignment score (see `match_prop()`).
+
+        :param score: Alignment score.
+        :param len_a: Length of seq_a.
+        :param len_b: Length of seq_b.
+        :param rotate: `True` if seq_b was duplicated head-to-tail for the alignment.
+
+        :return: Alignment proportion.
+        """
+
+        max_len = np.max([len_a, len_b])
+        min_len = np.min([len_a, len_b])
+
+        if rotate:
+            return min([
+                    np.min([score, min_len * self.__match]) / (max_len * self.__match),
+                    1.0
+            ])
+
+        return min([
+                score / (max_len * self.__match),
+                1.0
+        ])
+
     def match_prop(self, seq_a, seq_b):
         """
         Get the alignment score proportion over the max possible score between two sequences. To ollow tandem
@@ -257,20 +466,62 @@ class ScoreAligner:
 
             if min_len >= self.__rotate_min:
                 # Align with rotation
-                return min([
-                        np.min([self.score_align(seq_a, seq_b + seq_b), min_len * self.__match]) / (max_len * self.__match),
-                        1.0
-                ])
+                return self.__align_prop(self.score_align(seq_a, seq_b + seq_b), len(seq_a), len(seq_b), True)
 
             else:
                 # Align without rotation
-                return min([
-                        self.score_align(seq_a, seq_b) / (max_len * self.__match),
-                        1.0
-                ])
+                return self.__align_prop(self.score_align(seq_a, seq_b), len(seq_a), len(seq_b), False)
 
         elif min_len > self.__jaccard_kmer:
             return jaccard_distance(seq_a, seq_b, self.__jaccard_kmer)
 
         else:
             return 1 if seq_a.upper() == seq_b.upper() else 0
+
+    def match_prop_list(self, seq_a, seq_b_list):
+        """
+        Get `match_prop()` for one sequence against a list of sequences. Sequences that are aligned (not compared by
+        Jaccard index) are aligned together.
+
+        :param seq_a: Subject sequence.
+        :param seq_b_list: List of query sequences.
+
+        :return: Numpy array of alignment proportions (one for each sequence in `seq_b_list`).
+        """
+
+        match_list = np.zeros(len(seq_b_list))
+
+        # Find sequences to align
+        align_index_list = list()
+        align_seq_list = list()
+
+        for index in range(len(seq_b_list)):
+            seq_b = seq_b_list[index]
+
+            max_len = np.max([len(seq_a), len(seq_b)])
+            min_len = np.min([len(seq_a), len(seq_b)])
+
+            if self.__map_limit is None or max_len <= self.__map_limit:
+                align_index_list.append(index)
+                align_seq_list.append(seq_b + seq_b if min_len >= self.__rotate_min else seq_b)
+
+            else:
+                match_list[index] = self.match_prop(seq_a, seq_b)
+
+        # Align
+        if len(align_index_list) > 1:
+            score_list = self.__score_align_batch(
+                seq_a.upper().strip(), [seq_b.upper().strip() for seq_b in align_seq_list]
+            )
+
+        else:
+            score_list = [self.score_align(seq_a, seq_b) for seq_b in align_seq_list]
+
+        for index, score in zip(align_index_list, score_list):
+            seq_b = seq_b_list[index]
+
+            match_list[index] = self.__align_prop(
+                score, len(seq_a), len(seq_b), np.min([len(seq_a), len(seq_b)]) >= self.__rotate_min
+            )
+
+        return match_list
@@ -65,6 +65,44 @@ def read_csv_chrom(
         return pd.DataFrame([], columns=col_list)
 
 
+def read_csv_id(
+        in_file_name, id_set, chunksize=5000, **kwargs
+):
+    """
+    Read a DataFrame in chunks and save only records with IDs in `id_set`. Prevents reading a whole DataFrame into
+    memory when only a subset of records is needed.
+
+    :param in_file_name: Input file name.
+    :param id_set: Collection of IDs to keep (matched against the "ID" column).
+    :param chunksize: Size of chunks to read.
+    :param kwargs: Additional arguments to `pd.read_csv`.
+
+    :return: A Pandas DataFrame.
+    """
+
+    # Read
+    df_list = list()
+    col_list = None  # Save list of columns and return appropriate columns if no rows are found
+
+    df_iter = pd.read_csv(in_file_name, iterator=True, chunksize=chunksize, **kwargs)
+
+    for df in df_iter:
+
+        if col_list is None:
+            col_list = df.columns
+
+        if 'ID' not in df.columns:
+            raise RuntimeError(f'Cannot subset "{in_file_name}" by variant ID: No "ID" field')
+
+        df_list.append(df.loc[df['ID'].isin(id_set)])
+
+    # Return
+    if len(df_list) > 0:
+        return pd.concat(df_list, axis=0)
+    else:
+        return pd.DataFrame([], columns=col_list)
+
+
 def _apply_parallel_cb_result(index, df_split_results, p_pool, thread_done):
     """
     Get a function to save results.
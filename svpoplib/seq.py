@@ -262,18 +262,24 @@ def gfa_to_record_iter(gfa_file_name, record_set=None, require_all=True):
         ))
 
 
-def fa_to_series(fa_file_name):
+def fa_to_series(fa_file_name, record_set=None):
     """
     Read records from a FASTA file and generate a Pandas Series with IDs and keys and sequences as values. FASTA may
     be gzipped.
 
     :param fa_file_name: FASTA file name.
+    :param record_set: Set of record names to read or `None` to read all records. Records not in this set are skipped
+        as the FASTA is parsed and are not held in memory. Records in this set missing from the FASTA are not an error.
 
     :return: Pandas Series with IDs as keys and sequences as values.
     """
 
     df_series = pd.Series(
-        {record.id: str(record.seq) for record in fa_to_record_iter(fa_file_name)}
+        {
+            record.id: str(record.seq)
+            for record in fa_to_record_iter(fa_file_name, record_set=record_set, require_all=False)
+        },
+        dtype=object
     )
 
     df_series.name = 'SEQ'
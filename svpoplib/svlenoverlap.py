@@ -263,16 +263,18 @@ def nearest_by_svlen_overlap(
         df_source['MERGE_SAMPLES'] = df_source['MERGE_SAMPLES'].apply(lambda vals: set(vals.split(',')))
         df_target['MERGE_SAMPLES'] = df_target['MERGE_SAMPLES'].apply(lambda vals: set(vals.split(',')))
 
+    # Split by chromosome
+    df_source_chrom = dict(iter(df_source.groupby('#CHROM', sort=True, observed=True)))
+    df_target_chrom = dict(iter(df_target.groupby('#CHROM', sort=False, observed=True)))
+
     # Create an array to save results for parallelized output (one per chrom)
-    chrom_list = sorted(set(df_source['#CHROM']))
+    chrom_list = sorted(df_source_chrom.keys())
 
     df_split_results = [None] * len(chrom_list)
     results_received = {index: False for index in range(len(chrom_list))}
 
     # Setup arguments
     kwd_args = {
-        'df_source': df_source,
-        'df_target': df_target,
         'ro_min': ro_min,
         'szro_min': szro_min,
         'offset_max': offset_max,
@@ -294,7 +296,13 @@ def nearest_by_svlen_overlap(
         # Submit each split part to the worker pool
         for index in range(len(chrom_list)):
             pool.apply_async(
-                _overlap_worker, (chrom_list[index], ), kwd_args,
+                _overlap_worker,
+                (
+                    chrom_list[index],
+                    df_source_chrom[chrom_list[index]],
+                    df_target_chrom.get(chrom_list[index], df_target.iloc[0:0])
+                ),
+                kwd_args,
                 _apply_parallel_cb_result(index, df_split_results, results_received),
                 _apply_parallel_cb_error(chrom_list[index])
             )
@@ -307,7 +315,12 @@ def nearest_by_svlen_overlap(
 
         # Fill df_split_results with one thread
         for index in range(len(chrom_list)):
-            df_split_results[index] = _overlap_worker(chrom_list[index], **kwd_args)
+            df_split_results[index] = _overlap_worker(
+                chrom_list[index],
+                df_source_chrom[chrom_list[index]],
+                df_target_chrom.get(chrom_list[index], df_target.iloc[0:0]),
+                **kwd_args
+            )
 
     # Merge dataframes
     df_match = pd.concat(df_split_results, axis=0)
@@ -346,7 +359,7 @@ def _apply_parallel_cb_error(chrom):
 
 def _overlap_worker(
         chrom,
-        df_source, df_target,
+        df_source_chr, df_target_chr,
         ro_min, szro_min,
         offset_max, offsz_max,
         restrict_samples,
@@ -356,8 +369,8 @@ def _overlap_worker(
 ):
 
     # Get dataframes
-    df_source_chr = df_source.loc[df_source['#CHROM'] == chrom].copy()
-    df_target_chr = df_target.loc[df_target['#CHROM'] == chrom].copy()
+    df_source_chr = df_source_chr.copy()
+    df_target_chr = df_target_chr.copy()
 
     if 'SVTYPE' in df_source_chr.columns:
         df_source_chr['SVTYPE'] = df_source_chr['SVTYPE'].apply(lambda val: val.upper())
@@ -380,11 +393,25 @@ def _overlap_worker(
         df_source_chr['SEQ'] = df_source_chr['SEQ'].apply(lambda val: val.upper().strip())
         df_target_chr['SEQ'] = df_target_chr['SEQ'].apply(lambda val: val.upper().strip())
 
+    # Get target arrays. Matched targets are removed from the pool by clearing their flag in target_avail.
+    target_id = df_target_chr.index.values
+    target_pos = df_target_chr['POS'].values
+    target_end = df_target_chr['END'].values
+    target_svlen = df_target_chr['SVLEN'].values
+    target_svtype = df_target_chr['SVTYPE'].values
+
+    target_avail = np.ones(df_target_chr.shape[0], dtype=bool)
+
+    # Sort order for each priority column (descending columns are negated)
+    priority_sign = np.array([1.0 if ascending else -1.0 for ascending in priority_ascending])
+
     # Setup list of maximum matches
     overlap_list = list()
 
     # Get maximum matches
-    for index, source_row in df_source_chr.iterrows():
+    for source_index in range(df_source_chr.shape[0]):
+
+        source_row = df_source_chr.iloc[source_index]
 
         pos = source_row['POS']
         end = source_row['END']
@@ -393,153 +420,119 @@ def _overlap_worker(
 
         seq = source_row['SEQ'] if match_seq else None
 
-        df_target_row_pool = df_target_chr.copy()
-
         # Match SVTYPE
-        df_target_row_pool = df_target_row_pool.loc[df_target_row_pool['SVTYPE'] == svtype]
-
-        if df_target_row_pool.shape[0] == 0:
-            continue
+        pool_mask = target_avail & (target_svtype == svtype)
 
         # Filter by samples
         if restrict_samples:
-            df_target_row_pool = df_target_row_pool.loc[df_target_row_pool['MERGE_SAMPLES'].apply(
-                lambda sample_set: bool(sample_set & source_row['MERGE_SAMPLES'])
-            )].copy()
-
-            if df_target_row_pool.shape[0] == 0:
-                continue
+            pool_mask[pool_mask] = [
+                bool(sample_set & source_row['MERGE_SAMPLES'])
+                    for sample_set in df_target_chr['MERGE_SAMPLES'].values[pool_mask]
+            ]
 
         # Filter by REF and ALT
-        if match_ref or match_alt:
-            if match_ref:
-                df_target_row_pool = df_target_row_pool.loc[df_target_row_pool['REF'] == source_row['REF']]
+        if match_ref:
+            pool_mask &= df_target_chr['REF'].values == source_row['REF']
 
-            if df_target_row_pool.shape[0] == 0:
-                continue
+        if match_alt:
+            pool_mask &= df_target_chr['ALT'].values == source_row['ALT']
 
-            if match_alt:
-                df_target_row_pool = df_target_row_pool.loc[df_target_row_pool['ALT'] == source_row['ALT']]
+        pool_index = np.flatnonzero(pool_mask)
 
-            if df_target_row_pool.shape[0] == 0:
-                continue
+        if pool_index.shape[0] == 0:
+            continue
 
-            df_target_row_pool = df_target_row_pool.copy()
+        pool_pos = target_pos[pool_index]
+        pool_end = target_end[pool_index]
+        pool_svlen = target_svlen[pool_index]
 
-        # Size reciprocal overlap
-        df_target_row_pool['SZRO'] = df_target_row_pool.apply(
-            lambda row: np.min([svlen / row['SVLEN'], row['SVLEN'] / svlen]),
-            axis=1
-        )
+        with np.errstate(divide='ignore', invalid='ignore'):
 
-        if szro_min is not None:
-            df_target_row_pool = df_target_row_pool.loc[df_target_row_pool['SZRO'] >= szro_min].copy()
+            # Size reciprocal overlap
+            pool_szro = np.minimum(svlen / pool_svlen, pool_svlen / svlen)
 
-            if df_target_row_pool.shape[0] == 0:
-                continue
+            # Offset
+            pool_offset = np.minimum(np.abs(pos - pool_pos), np.abs(end - pool_end))
 
-        # Offset
-        df_target_row_pool['OFFSET'] = df_target_row_pool.apply(
-            lambda row: np.min(
-                [
-                    np.abs(pos - row['POS']),
-                    np.abs(end - row['END'])
-                ]
-            ), axis=1
-        )
+            # Reciprocal overlap
+            if svtype != 'INS':
+                pool_ro = svpoplib.variant.reciprocal_overlap_array(pos, end, pool_pos, pool_end)
+            else:
+                pool_ro = svpoplib.variant.reciprocal_overlap_array(pos, pos + svlen, pool_pos, pool_pos + pool_svlen)
 
-        if offset_max is not None:
-            df_target_row_pool = df_target_row_pool.loc[df_target_row_pool['OFFSET'] <= offset_max].copy()
+            # Size-offset
+            pool_offsz = pool_offset / np.minimum(svlen, pool_svlen)
 
-            if df_target_row_pool.shape[0] == 0:
-                continue
+        # Apply thresholds
+        pool_mask = np.ones(pool_index.shape[0], dtype=bool)
 
-        # Reciprocal overlap
-        if svtype != 'INS':
-            df_target_row_pool['RO'] = df_target_row_pool.apply(lambda row:
-                svpoplib.variant.reciprocal_overlap(pos, end, row['POS'], row['END']),
-                axis=1
-            )
-        else:
-            df_target_row_pool['RO'] = df_target_row_pool.apply(lambda row:
-                svpoplib.variant.reciprocal_overlap(pos, pos + svlen, row['POS'], row['POS'] + row['SVLEN']),
-                axis=1
-            )
+        if szro_min is not None:
+            pool_mask &= pool_szro >= szro_min
+
+        if offset_max is not None:
+            pool_mask &= pool_offset <= offset_max
 
         if ro_min is not None:
-            df_target_row_pool = df_target_row_pool.loc[df_target_row_pool['RO'] >= ro_min].copy()
+            pool_mask &= pool_ro >= ro_min
 
-            if df_target_row_pool.shape[0] == 0:
-                continue
+        if offsz_max is not None:
+            pool_mask &= pool_offsz <= offsz_max
 
-        # Size-offset max
-        df_target_row_pool['OFFSZ'] = df_target_row_pool.apply(
-            lambda row: row['OFFSET'] / min(svlen, row['SVLEN']),
-            axis=1
-        )
+        if not np.any(pool_mask):
+            continue
 
-        if offsz_max is not None:
-            df_target_row_pool = df_target_row_pool.loc[df_target_row_pool['OFFSZ'] <= offsz_max].copy()
+        pool_index = pool_index[pool_mask]
 
-            if df_target_row_pool.shape[0] == 0:
-                continue
+        pool_stats = {
+            'OFFSET': pool_offset[pool_mask],
+            'RO': pool_ro[pool_mask],
+            'SZRO': pool_szro[pool_mask],
+            'OFFSZ': pool_offsz[pool_mask]
+        }
 
         # Compute sequence match
         if match_seq:
 
             # Do match
-            df_target_row_pool['MATCH'] = df_target_row_pool['SEQ'].apply(
-                lambda seq_target: aligner.match_prop(seq, seq_target)
-            )
+            pool_match = aligner.match_prop_list(seq, df_target_chr['SEQ'].values[pool_index])
 
             # Filter
-            df_target_row_pool = df_target_row_pool.loc[df_target_row_pool['MATCH'] >= align_match_prop].copy()
+            pool_mask = pool_match >= align_match_prop
 
-            if df_target_row_pool.shape[0] == 0:
+            if not np.any(pool_mask):
                 continue
 
+            pool_index = pool_index[pool_mask]
+            pool_stats = {key: val[pool_mask] for key, val in pool_stats.items()}
+
+            pool_stats['MATCH'] = pool_match[pool_mask]
+
         else:
-            df_target_row_pool['MATCH'] = np.nan
+            pool_stats['MATCH'] = np.full(pool_index.shape[0], np.nan)
 
-        # Get distance calculations
-        if df_target_row_pool.shape[0] == 0:
-            continue
+        # Get max row (stable sort on priority columns, first priority is the primary key)
+        max_index = np.lexsort([
+            pool_stats[priority[i]] * priority_sign[i] for i in range(len(priority) - 1, -1, -1)
+        ])[0]
 
-        #
-        # df_distance = df_target_row_pool.apply(lambda row: pd.Series(
-        #     [
-        #         row['OFFSET'],
-        #         svpoplib.variant.reciprocal_overlap(pos, end, row['POS'], row['END']),
-        #         row['SZRO'],
-        #         row['OFFSET'] / svlen,
-        #         row['MATCH']
-        #     ],
-        #     index=['OFFSET', 'RO', 'SZRO', 'OFFSZ', 'MATCH']
-        # ), axis=1)
-        #
-        # # Get max row
-        # max_row = df_distance.reset_index().sort_values(priority, ascending=priority_ascending).iloc[0]
-
-        # Get max row
-        max_row = df_target_row_pool.reset_index().sort_values(priority, ascending=priority_ascending).iloc[0]
-
-        max_row['ID'] = index
+        target_index = pool_index[max_index]
 
         # Save match record
-        overlap_list.append(max_row)
+        overlap_list.append((
+            df_source_chr.index[source_index],
+            target_id[target_index],
+            pool_stats['OFFSET'][max_index],
+            pool_stats['RO'][max_index],
+            pool_stats['SZRO'][max_index],
+            pool_stats['OFFSZ'][max_index],
+            pool_stats['MATCH'][max_index]
+        ))
 
         # Remove from target pool (cannot support more than one variant)
-        df_target_chr.drop(max_row['TARGET_ID'], inplace=True)
+        target_avail[target_index] = False
 
-        if df_target_chr.shape[0] == 0:
+        if not np.any(target_avail):
             break  # No more target matches to process
 
     # Merge and return
-    if len(overlap_list) == 0:
-        return pd.DataFrame([], columns=('ID', 'TARGET_ID', 'OFFSET', 'RO', 'SZRO', 'OFFSZ', 'MATCH'))
-
-    return pd.concat(
-        overlap_list, axis=1
-    ).T.loc[
-       :, ['ID', 'TARGET_ID', 'OFFSET', 'RO', 'SZRO', 'OFFSZ', 'MATCH']
-    ]
+    return pd.DataFrame(overlap_list, columns=('ID', 'TARGET_ID', 'OFFSET', 'RO', 'SZRO', 'OFFSZ', 'MATCH'))
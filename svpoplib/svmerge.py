@@ -3,13 +3,11 @@ Code for merging variant sets.
 """
 
 import collections
-import intervaltree
 import multiprocessing
 import numpy as np
 import pandas as pd
 import re
 import sys
-import traceback
 
 import svpoplib
 import kanapy
@@ -131,7 +129,7 @@ def merge_variants_nr(bed_list, sample_names, merge_config, fa_list=None, subset
     if not all(bool(val) for val in sample_names):
         raise RuntimeError('Found empty sample names')
 
-    if any([re.match('.*\\s.*', val) is not None for val in sample_names]):
+    if any(re.search('\\s', val) is not None for val in sample_names):
         raise RuntimeError('Error: Sample names contain whitespace')
 
     if any([',' in val or ';' in val for val in sample_names]):
@@ -218,6 +216,8 @@ def merge_variants_nr(bed_list, sample_names, merge_config, fa_list=None, subset
     # Add each variant to the table
     df_support_list = list()
 
+    merged_id_set = set(df['ID'])  # IDs in the merged set (df), updated as new variants are appended
+
     for index in range(1, len(bed_list)):
 
         ## Read ##
@@ -238,15 +238,18 @@ def merge_variants_nr(bed_list, sample_names, merge_config, fa_list=None, subset
         ## Build intersect support table for each intersect test (exact, RO, etc) ##
         support_table_list = list()
 
-        # Create copies of df and df_next that can be subset (variants removed by each phase of intersection)
-        df_sub = df.copy()
-        df_next_sub = df_next.copy()
+        # Variants in df and df_next that are not yet matched (variants removed by each phase of intersection)
+        keep = np.ones(df.shape[0], dtype=bool)
+        keep_next = np.ones(df_next.shape[0], dtype=bool)
 
         # Process match types
         for merge_spec in merge_config.spec_list:
             if verbose:
                 print(f'* {merge_spec}')
 
+            df_sub = df if np.all(keep) else df.loc[keep]
+            df_next_sub = df_next if np.all(keep_next) else df_next.loc[keep_next]
+
             spec_type = merge_spec.spec_type.lower()
 
             # Get support table
@@ -318,15 +321,12 @@ def merge_variants_nr(bed_list, sample_names, merge_config, fa_list=None, subset
             if df_support is not None:
                 support_table_list.append(df_support)
 
-                id_set = set(df_support['ID'])
-                id_next_set = set(df_support['TARGET_ID'])
-
-                df_sub = df_sub.loc[df_sub['ID'].apply(lambda val: val not in id_set)]
-                df_next_sub = df_next_sub.loc[df_next_sub['ID'].apply(lambda val: val not in id_next_set)]
+                keep &= ~ df['ID'].isin(df_support['ID']).values
+                keep_next &= ~ df_next['ID'].isin(df_support['TARGET_ID']).values
 
         # Clean
-        del(df_sub)
-        del(df_next_sub)
+        del(keep)
+        del(keep_next)
         del(df_support)
 
         # Construct support table
@@ -338,7 +338,7 @@ def merge_variants_nr(bed_list, sample_names, merge_config, fa_list=None, subset
         # * SAMPLE:
 
         if len(support_table_list) > 0 and any([df_support_check.shape[0] > 0 for df_support_check in support_table_list]):
-            df_support = pd.concat(support_table_list)
+            df_support = pd.concat(support_table_list, copy=False)
         else:
             df_support = pd.DataFrame([], columns=['ID', 'SUPPORT_ID'])  # Only the ID column is read if the DataFrame is empty
 
@@ -350,7 +350,7 @@ def merge_variants_nr(bed_list, sample_names, merge_config, fa_list=None, subset
 
             # Add sample name
             df_support['SUPPORT_SAMPLE'] = sample_name
-            df_support['SAMPLE'] = df['SAMPLE']
+            df_support['SAMPLE'] = df_support['ID'].map(df['SAMPLE'])
 
             # Rename columns (offset merger column names to support column names)
             df_support.columns = [support_col_rename.get(col, col) for col in df_support.columns]
@@ -380,9 +380,7 @@ def merge_variants_nr(bed_list, sample_names, merge_config, fa_list=None, subset
             df_support_list.append(df_support)
 
         # Read new variants from this sample (variants that do not support an existing call)
-        support_id_set = set(df_support['SUPPORT_ID'])
-
-        df_new = df_next.loc[df_next['ID'].apply(lambda val: val not in support_id_set)].copy()
+        df_new = df_next.loc[~ df_next['ID'].isin(df_support['SUPPORT_ID'])].copy()
 
         if df_new.shape[0] > 0:
             df_new['SAMPLE'] = sample_name
@@ -390,7 +388,7 @@ def merge_variants_nr(bed_list, sample_names, merge_config, fa_list=None, subset
             df_new['SUPPORT_ID'] = df_new['ID']
 
             # De-duplicate IDs
-            df_new['ID'] = svpoplib.variant.version_id(df_new['ID'], set(df['ID']))
+            df_new['ID'] = svpoplib.variant.version_id(df_new['ID'], merged_id_set)
             df_new.set_index('ID', inplace=True, drop=False)
 
             # Ensure consistent columns
@@ -401,9 +399,22 @@ def merge_variants_nr(bed_list, sample_names, merge_config, fa_list=None, subset
                     ', '.join([col for col in df_new.columns if col not in set(df.columns)])
                 ))
 
+            # Use the same categories in both tables (concatenating categoricals with different categories yields object
+            # columns)
+            for col in ('#CHROM', 'SVTYPE'):
+                cat_list = sorted(set(df[col].cat.categories) | set(df_new[col].cat.categories))
+
+                df[col] = df[col].cat.set_categories(cat_list)
+                df_new[col] = df_new[col].cat.set_categories(cat_list)
+
             # Append new variants
-            df = pd.concat([df, df_new.loc[:, df.columns]], axis=0)
-            df.sort_values(['#CHROM', 'POS', 'END', 'ID'], inplace=True)
+            df = pd.concat([df, df_new.loc[:, df.columns]], axis=0, copy=False)
+            merged_id_set.update(df_new['ID'])
+
+            # Sort for merging the next sample (variant order sets merge priority). The finalized support table is
+            # re-sorted, so the order after the last sample is not used.
+            if index < len(bed_list) - 1:
+                df.sort_values(['#CHROM', 'POS', 'END', 'ID'], inplace=True)
 
     # Remove SEQ
     if 'SEQ' in df.columns:
@@ -425,34 +436,32 @@ def merge_variants_nr(bed_list, sample_names, merge_config, fa_list=None, subset
         else:
             df['SUPPORT_MATCH'] = np.nan
 
-        df = df[[
+        support_cols = [
             'ID', 'SAMPLE',
             'SUPPORT_ID', 'SUPPORT_SAMPLE',
             'SUPPORT_OFFSET', 'SUPPORT_RO', 'SUPPORT_SZRO', 'SUPPORT_OFFSZ', 'SUPPORT_MATCH',
             'IS_PRIMARY'
-        ]]
-
-        # Add support variants
-        if len(df_support_list) > 0:
-            df_support = pd.concat(df_support_list)
+        ]
 
+        # Add support variants (one concatenation for the merged set and all support tables)
+        for df_support in df_support_list:
             df_support['IS_PRIMARY'] = False
 
-            df_support = df_support[[
-                'ID', 'SAMPLE',
-                'SUPPORT_ID', 'SUPPORT_SAMPLE',
-                'SUPPORT_OFFSET', 'SUPPORT_RO', 'SUPPORT_SZRO', 'SUPPORT_OFFSZ', 'SUPPORT_MATCH',
-                'IS_PRIMARY'
-            ]]
+        support_dtypes = df[support_cols].dtypes.to_dict()  # Match merged set types (support tables may be object)
+
+        df = pd.concat(
+            [df[support_cols]] + [df_support[support_cols].astype(support_dtypes) for df_support in df_support_list],
+            axis=0, copy=False
+        )
 
-            df = pd.concat([df, df_support])
+        del(df_support_list)
 
         # Make SAMPLE and SUPPORT_SAMPLE categorical (sort in the same order as they were merged)
         df['SAMPLE'] = pd.Categorical(df['SAMPLE'], sample_names)
         df['SUPPORT_SAMPLE'] = pd.Categorical(df['SUPPORT_SAMPLE'], sample_names)
 
         # Sort by support (best support first)
-        df['SUPPORT_OFFSET'] = df['SUPPORT_OFFSET'].apply(lambda val: np.max([0, val]))
+        df['SUPPORT_OFFSET'] = df['SUPPORT_OFFSET'].clip(lower=0)
         df['SUPPORT_RO'] = np.abs(df['SUPPORT_RO'])
         df['SUPPORT_SZRO'] = np.abs(df['SUPPORT_SZRO'])
         df['SUPPORT_OFFSZ'] = np.abs(df['SUPPORT_OFFSZ'])
@@ -465,33 +474,44 @@ def merge_variants_nr(bed_list, sample_names, merge_config, fa_list=None, subset
             inplace=True
         )
 
-        # Find best support variant for each mergeset variant (per sample)
-        # Duplicates should not occur, but drop them if they do
-        df.drop_duplicates(['ID', 'SUPPORT_SAMPLE'], keep='first', inplace=True)
-
-        # Re-sort by ID then SAMPLE (for concatenating stats in order)
-        df.sort_values(['ID', 'SUPPORT_SAMPLE'], inplace=True)
-
-        df_support = df.groupby(
-            'ID'
-        ).apply(lambda subdf: pd.Series(
-            [
-                ','.join(subdf['SUPPORT_SAMPLE']),
-                ','.join(subdf['SUPPORT_ID']),
-
-                ','.join(['{:.2f}'.format(val) for val in subdf['SUPPORT_RO']]),
-                ','.join(['{:.0f}'.format(val) for val in subdf['SUPPORT_OFFSET']]),
-                ','.join(['{:.2f}'.format(val) for val in subdf['SUPPORT_SZRO']]),
-                ','.join(['{:.2f}'.format(val) for val in subdf['SUPPORT_OFFSZ']]),
-                ','.join(['{:.2f}'.format(val) for val in subdf['SUPPORT_MATCH']]),
-                subdf.shape[0]
-            ],
-            index=[
-                'MERGE_SAMPLES', 'MERGE_VARIANTS',
-                'MERGE_RO', 'MERGE_OFFSET', 'MERGE_SZRO', 'MERGE_OFFSZ', 'MERGE_MATCH',
-                'MERGE_N'
-            ]
-        ))
+        # Find best support variant for each mergeset variant (per sample) and re-sort by ID then SAMPLE (for
+        # concatenating stats in order). Duplicates should not occur, but drop them if they do.
+        #
+        # Uses an integer key ordered by ID (sorted factor codes) then SUPPORT_SAMPLE (categorical codes), np.unique
+        # returns the first row for each key in key order.
+        id_code = pd.factorize(df['ID'], sort=True)[0].astype(np.int64)
+
+        _, first_index = np.unique(
+            id_code * len(sample_names) + df['SUPPORT_SAMPLE'].cat.codes.values,
+            return_index=True
+        )
+
+        df = df.iloc[first_index]
+
+        del(id_code)
+
+        # Format support values and concatenate per merged variant
+        df_group = df.assign(
+            SUPPORT_SAMPLE=df['SUPPORT_SAMPLE'].astype(str),
+            SUPPORT_RO=df['SUPPORT_RO'].map('{:.2f}'.format),
+            SUPPORT_OFFSET=df['SUPPORT_OFFSET'].map('{:.0f}'.format),
+            SUPPORT_SZRO=df['SUPPORT_SZRO'].map('{:.2f}'.format),
+            SUPPORT_OFFSZ=df['SUPPORT_OFFSZ'].map('{:.2f}'.format),
+            SUPPORT_MATCH=df['SUPPORT_MATCH'].map('{:.2f}'.format)
+        ).groupby('ID')
+
+        df_support = pd.DataFrame({
+            'MERGE_SAMPLES': df_group['SUPPORT_SAMPLE'].agg(','.join),
+            'MERGE_VARIANTS': df_group['SUPPORT_ID'].agg(','.join),
+            'MERGE_RO': df_group['SUPPORT_RO'].agg(','.join),
+            'MERGE_OFFSET': df_group['SUPPORT_OFFSET'].agg(','.join),
+            'MERGE_SZRO': df_group['SUPPORT_SZRO'].agg(','.join),
+            'MERGE_OFFSZ': df_group['SUPPORT_OFFSZ'].agg(','.join),
+            'MERGE_MATCH': df_group['SUPPORT_MATCH'].agg(','.join),
+            'MERGE_N': df_group.size()
+        })
+
+        del(df_group)
 
         if not merge_config.any_match():
             df_support['SUPPORT_MATCH'] = np.nan
@@ -553,9 +573,7 @@ def merge_annotations(df_merge, anno_tab_list, sample_names, sort_columns=None):
         df_merge_subset = df_merge.loc[df_merge['MERGE_SRC'] == sample_name]
         id_dict = {row[1]['MERGE_SRC_ID']: row[1]['ID'] for row in df_merge_subset.iterrows()}
 
-        id_subset = set(df_merge_subset['MERGE_SRC_ID'])
-
-        df_anno = df_anno.loc[df_anno['ID'].apply(lambda svid: svid in id_subset)]
+        df_anno = df_anno.loc[df_anno['ID'].isin(df_merge_subset['MERGE_SRC_ID'])].copy()
 
         df_anno['ID'] = df_anno['ID'].apply(lambda svid: id_dict[svid])
         df_anno.index = df_anno['ID']
@@ -563,7 +581,7 @@ def merge_annotations(df_merge, anno_tab_list, sample_names, sort_columns=None):
         df_list.append(df_anno)
 
     # Merge subsets
-    df_anno = pd.concat(df_list, axis=0)
+    df_anno = pd.concat(df_list, axis=0, copy=False)
 
     # Resort
     if sort_columns is not None:
@@ -695,7 +713,12 @@ def merge_sample_by_support(df_support, bed_list, sample_names):
 
         # Read variants from sample
         if type(bed_file_name) != pd.DataFrame:
-            df_sample = pd.read_csv(bed_file_name, sep='\t', header=0)  # TODO: low_memory=False
+            if df_support_sample.shape[0] > 0:
+                df_sample = svpoplib.pd.read_csv_id(
+                    bed_file_name, df_support_sample['MERGE_SRC_ID'], sep='\t', header=0, chunksize=100000
+                )
+            else:
+                df_sample = pd.read_csv(bed_file_name, sep='\t', header=0, nrows=0)  # Columns only
         else:
             df_sample = bed_file_name.copy()
 
@@ -731,7 +754,7 @@ def merge_sample_by_support(df_support, bed_list, sample_names):
 
     # Create merged dataframe
     if merge_df_list:
-        df_merge = pd.concat(merge_df_list, axis=0, sort=False)
+        df_merge = pd.concat(merge_df_list, axis=0, sort=False, copy=False)
     else:
         df_merge = pd.DataFrame([], columns=col_list)
 
@@ -807,7 +830,7 @@ def read_variant_table(
 
     if type(bed_file_name) != pd.DataFrame:
         df = svpoplib.pd.read_csv_chrom(
-            bed_file_name, chrom=subset_chrom,
+            bed_file_name, chrom=subset_chrom, chunksize=100000,
             sep='\t', header=0,
             usecols=lambda col: col in col_set,
             dtype={'#CHROM': str}
@@ -828,7 +851,7 @@ def read_variant_table(
         if 'SEQ' in df.columns:
             raise RuntimeError(f'Duplicate SEQ sources for BED file "{bed_file_name}": BED contains a SEQ column, and read_variant_table() SEQ from a FASTA file')
 
-        df = df.join(svpoplib.seq.fa_to_series(fa_file_name), on='ID', how='left')
+        df = df.join(svpoplib.seq.fa_to_series(fa_file_name, record_set=set(df['ID'])), on='ID', how='left')
 
         if np.any(pd.isnull(df['SEQ'])):
             id_missing = list(df.loc[pd.isnull(df['SEQ']), 'ID'])
@@ -850,7 +873,7 @@ def read_variant_table(
         if 'END' not in df.columns or 'SVTYPE' not in df.columns:
             raise RuntimeError(f'Missing SVLEN in {bed_file_name}: Need both SVTYPE and END to set automatically')
 
-        if (np.any(df['SVTYPE'].apply(lambda val: val.upper()) == 'INS')):
+        if (df['SVTYPE'].str.upper() == 'INS').any():
             raise RuntimeError(f'Missing SVLEN in {bed_file_name}: Cannot compute for insertions (SVTYPE must not be INS for any record)')
 
         df['SVLEN'] = df['END'] - df['POS']
@@ -865,9 +888,18 @@ def read_variant_table(
         raise RuntimeError(f'Error checking columns in {bed_file_name}: {ex}')
 
     # Check SVLEN
-    if np.any(df['SVLEN'] < 0):
+    if (df['SVLEN'] < 0).any():
         raise RuntimeError(f'Negative SVLEN entries in {bed_file_name}')
 
+    # Set coordinate types
+    df['POS'] = df['POS'].astype(np.int32)
+    df['END'] = df['END'].astype(np.int32)
+    df['SVLEN'] = df['SVLEN'].astype(np.int32)
+
+    # Low-cardinality columns as categorical (categories are sorted, so sort order is unchanged)
+    df['#CHROM'] = df['#CHROM'].astype('category')
+    df['SVTYPE'] = df['SVTYPE'].astype('category')
+
     # Sort
     df.sort_values(['#CHROM', 'POS', 'END', 'ID'], inplace=True)
 
@@ -930,225 +962,302 @@ def get_support_table(
 
     if df_next.shape[0] > 0:
 
-        df_support_list_chrom = list()
+        # Get record pairs for all chromosomes. Each element of job_list is a tuple of source and target row indices (in
+        # df and df_next) for one record pair. Record pairs on different chromosomes never intersect, so all are run in
+        # one pool. Worker processes receive df and df_next once when the pool starts, jobs only pass row indices.
+        job_list = list()
 
-        chrom_list = sorted(set(df['#CHROM']) | set(df_next['#CHROM']))
+        chrom_index_dict = df.groupby('#CHROM', sort=False, observed=True).indices
+        chrom_next_index_dict = df_next.groupby('#CHROM', sort=False, observed=True).indices
+
+        chrom_list = sorted(set(chrom_index_dict) | set(chrom_next_index_dict))
 
         for chrom in chrom_list:
 
-            df_chrom = df.loc[df['#CHROM'] == chrom]
-            df_next_chrom = df_next.loc[df_next['#CHROM'] == chrom]
+            chrom_index = chrom_index_dict.get(chrom, np.array([], dtype=np.int64))
+            chrom_next_index = chrom_next_index_dict.get(chrom, np.array([], dtype=np.int64))
+
+            df_chrom = df.iloc[chrom_index]
+            df_next_chrom = df_next.iloc[chrom_next_index]
 
             if cluster_merge:
                 # Split merge, isolate to overlapping intervals before merging.
                 # This strategy limits combinatorial explosion merging large sets.
 
-                # Create an interval tree of records to intersect.
-                #
-                # For each interval, the data element will be a tuple of two sets:
-                #   [0]: Set of source variant IDs in the interval.
-                #   [1]: Set of target variant IDs in the interval.
-                tree = intervaltree.IntervalTree()
-
-                # Add max intervals for each source variant
-                for row_index, row in df_chrom.iterrows():
-                    if offsz_max is not None:
-                        interval_flank = max(base_interval_flank, row['SVLEN'] * offsz_max)
-                    else:
-                        interval_flank = base_interval_flank
-
-                    tree.addi(
-                        row['POS'] - interval_flank,
-                        (row['END'] if row['SVTYPE'] != 'INS' else row['POS'] + 1) + interval_flank,
-                        ({row['ID']}, set())
-                    )
+                # Group source and target variants into clusters of intersecting intervals. Each element of
+                # record_pair_list is a tuple of two sets:
+                #   [0]: Set of source variant IDs in the cluster.
+                #   [1]: Set of target variant IDs in the cluster.
+                record_pair_list = get_cluster_record_pairs(
+                    df_chrom, df_next_chrom, base_interval_flank, offsz_max=offsz_max, ro_min=ro_min
+                )
 
-                # For each target variant in turn, merge all source intervals it intersects. Source and target ID sets
-                # in the interval data are merged with the intervals.
-                for row_index, row in df_next_chrom.iterrows():
+            else:
+                record_pair_list = [
+                    (set(df_chrom['ID']), set(df_next_chrom['ID']))
+                ]
 
-                    pos = row['POS']
-                    end = (
-                        row['END'] if (
-                            row['SVTYPE'] != 'INS' or ro_min is None
-                        ) else row['POS'] + row['SVLEN']
-                    )
+            # Report
+            if verbose:
+                print('\t* Split ref {} into {} parts'.format(chrom, len(record_pair_list)))
 
-                    source_rows = set()
-                    target_rows = {row['ID']}
+            # Split variant tables by record pair (one pass over each table)
+            src_part = {var_id: part for part in range(len(record_pair_list)) for var_id in record_pair_list[part][0]}
+            tgt_part = {var_id: part for part in range(len(record_pair_list)) for var_id in record_pair_list[part][1]}
 
-                    pos_set = set()
-                    end_set = set()
+            chrom_index_part = pd.Series(chrom_index).groupby(df_chrom['ID'].map(src_part).values).indices
+            chrom_next_index_part = pd.Series(chrom_next_index).groupby(df_next_chrom['ID'].map(tgt_part).values).indices
 
-                    # Collapse intersecting intervals
-                    for interval in tree[pos:end]:
-                        pos_set.add(interval.begin)
-                        end_set.add(interval.end)
+            for part in range(len(record_pair_list)):
+                job_list.append((
+                    chrom_index[chrom_index_part.get(part, [])],
+                    chrom_next_index[chrom_next_index_part.get(part, [])]
+                ))
 
-                        source_rows |= interval.data[0]
-                        target_rows |= interval.data[1]
+            del(chrom_index_part)
+            del(chrom_next_index_part)
 
-                        tree.discard(interval)
+            # Clean up
+            del record_pair_list
 
-                    # Add new interval if any
-                    if source_rows:
-                        tree.addi(min(pos_set), max(end_set), (source_rows, target_rows))
+        # Shortcut if no records
+        if len(job_list) > 0:
+
+            kwd_args = {
+                'ro_min': ro_min,
+                'szro_min': szro_min,
+                'offset_max': offset_max,
+                'offsz_max': offsz_max,
+                'priority': ['RO', 'SZRO', 'OFFSET', 'OFFSZ', 'MATCH'],
+                'threads': 1,
+                'match_ref': match_ref,
+                'match_alt': match_alt,
+                'aligner': aligner,
+                'align_match_prop': align_match_prop
+            }
+
+            # Run jobs. Results are returned in job order (one for each record pair), and an exception in any job is
+            # raised here. Jobs are run in this process if there is nothing to run in parallel.
+            if verbose:
+                print('Waiting...')
 
-                # Create a list of tuples where each element is the data from the interval. Include only intervals
-                # with at least one target row.
-                record_pair_list = [interval.data for interval in tree if len(interval.data[1]) > 0]
+            sys.stderr.flush()
+            sys.stdout.flush()
 
-                del tree
+            if threads == 1 or len(job_list) == 1:
+                df_support_list = [
+                    svpoplib.svlenoverlap.nearest_by_svlen_overlap(
+                        df.iloc[src_index], df_next.iloc[tgt_index], **kwd_args
+                    ) for src_index, tgt_index in job_list
+                ]
 
             else:
-                record_pair_list = [
-                    (set(df_chrom['ID']), set(df_next_chrom['ID']))
-                ]
+                with multiprocessing.Pool(
+                        threads, initializer=_support_table_worker_init, initargs=(df, df_next, kwd_args)
+                ) as pool:
+                    df_support_list = pool.starmap(
+                        _support_table_worker, job_list, chunksize=max(1, len(job_list) // (threads * 4))
+                    )
+
+            del job_list
+
+            sys.stderr.flush()
+            sys.stdout.flush()
 
-            # Report
             if verbose:
-                print('\t* Split ref {} into {} parts'.format(chrom, len(record_pair_list)))
+                print('Done Waiting.')
 
-            # Shortcut if no records
-            if len(record_pair_list) > 0:
+            sys.stderr.flush()
+            sys.stdout.flush()
 
-                # Init merged table list (one for each record pair)
-                df_support_list = [None] * len(record_pair_list)
+            # Check for null output
+            n_fail = np.sum([val is None for val in df_support_list])
 
-                # Setup jobs
-                pool = multiprocessing.Pool(threads)
+            if n_fail > 0:
+                raise RuntimeError('Failed merging {} of {} record groups'.format(n_fail, len(df_support_list)))
 
-                kwd_args = {
-                    'ro_min': ro_min,
-                    'szro_min': szro_min,
-                    'offset_max': offset_max,
-                    'offsz_max': offsz_max,
-                    'priority': ['RO', 'SZRO', 'OFFSET', 'OFFSZ', 'MATCH'],
-                    'threads': 1,
-                    'match_ref': match_ref,
-                    'match_alt': match_alt,
-                    'aligner': aligner,
-                    'align_match_prop': align_match_prop
-                }
+            # Merge supporting dataframes
+            df_support = pd.concat(df_support_list, axis=0, sort=False, copy=False).reset_index(drop=True)
 
-                # Setup callback handler
-                def _apply_parallel_cb_result(record_pair_index, df_support_list):
-                    """ Get a function to save results. """
+            # Clean up
+            del df_support_list
 
-                    def callback_handler(subdf):
-                        df_support_list[record_pair_index] = subdf
+        else:
+            df_support = pd.DataFrame(columns=['ID', 'TARGET_ID', 'OFFSET', 'RO', 'SZRO', 'OFFSZ', 'MATCH'])
 
-                    return callback_handler
+    else:
+        df_support = svpoplib.svlenoverlap.nearest_by_svlen_overlap(
+            df_source=df,
+            df_target=df_next,
+            ro_min=ro_min,
+            szro_min=szro_min,
+            offset_max=offset_max,
+            offsz_max=offsz_max,
+            priority=['RO', 'SZRO', 'OFFSET', 'OFFSZ', 'MATCH'],
+            threads=threads,
+            match_ref=match_ref,
+            match_alt=match_alt
+        )
 
-                def _apply_parallel_cb_error(record_pair_index, df_support_list):
-                    """Get an error callback function"""
+    return df_support if df_support.shape[0] > 0 else None
 
-                    def callback_handler(ex):
-                        df_support_list[record_pair_index] = ex
 
-                        print(f'Failed {record_pair_index}: {ex}', file=sys.stderr)
-                        traceback.print_tb(ex.__traceback__)
-                        sys.stderr.flush()
+# Variant tables and arguments for support table worker processes (set by _support_table_worker_init)
+_WORKER_DF = None
+_WORKER_DF_NEXT = None
+_WORKER_KWD_ARGS = None
 
-                        try:
-                            print(f'Terminating: {record_pair_index}', file=sys.stderr)
-                            sys.stderr.flush()
 
-                            pool.terminate()
+def _support_table_worker_init(df, df_next, kwd_args):
+    """
+    Initialize a support table worker process.
 
-                        except Exception as ex:
-                            print(f'Caught error while terminating: {record_pair_index}: {ex}', file=sys.stderr)
-                            sys.stderr.flush()
+    :param df: Set of variants in the accepted set.
+    :param df_next: Set of variants to intersect with `df`.
+    :param kwd_args: Arguments to `svpoplib.svlenoverlap.nearest_by_svlen_overlap()`.
+    """
 
-                        print(f'Exiting error handler: {record_pair_index}')
+    global _WORKER_DF
+    global _WORKER_DF_NEXT
+    global _WORKER_KWD_ARGS
 
-                    return callback_handler
+    _WORKER_DF = df
+    _WORKER_DF_NEXT = df_next
+    _WORKER_KWD_ARGS = kwd_args
 
-                # Submit jobs
-                for record_pair_index in range(len(record_pair_list)):
 
-                    try:
-                        pool.apply_async(
-                            svpoplib.svlenoverlap.nearest_by_svlen_overlap,
-                            (
-                                df_chrom.loc[
-                                    df_chrom['ID'].apply(lambda var_id: var_id in record_pair_list[record_pair_index][0])
-                                ],
-                                df_next_chrom.loc[
-                                    df_next_chrom['ID'].apply(lambda var_id: var_id in record_pair_list[record_pair_index][1])
-                                ]
-                            ),
-                            kwd_args,
-                            _apply_parallel_cb_result(record_pair_index, df_support_list),
-                            _apply_parallel_cb_error(record_pair_index, df_support_list)
-                        )
+def _support_table_worker(src_index, tgt_index):
+    """
+    Get a support table for one record pair in a worker process.
 
-                    except:
-                        pass
+    :param src_index: Row indices in `df` (source variants).
+    :param tgt_index: Row indices in `df_next` (target variants).
 
-                # Wait for jobs
-                if verbose:
-                    print('Waiting...')
+    :return: Support table.
+    """
 
-                sys.stderr.flush()
-                sys.stdout.flush()
+    return svpoplib.svlenoverlap.nearest_by_svlen_overlap(
+        _WORKER_DF.iloc[src_index], _WORKER_DF_NEXT.iloc[tgt_index], **_WORKER_KWD_ARGS
+    )
 
-                pool.close()
-                pool.join()
-                sys.stderr.flush()
-                sys.stdout.flush()
 
-                if verbose:
-                    print('Done Waiting.')
+def get_cluster_record_pairs(df, df_next, base_interval_flank, offsz_max=None, ro_min=None):
+    """
+    Split variants on one chromosome into clusters of records that could possibly intersect. Source variants (`df`) are
+    expanded by a flank covering the maximum distance a supporting variant may be placed, and each starts in its own
+    cluster. Target variants (`df_next`) are not expanded and are visited in table order. Each target variant joins
+    all clusters it intersects into one cluster spanning the intersected clusters (the target interval does not extend
+    it). Target variants that do not intersect a cluster are dropped.
+
+    Source clusters are kept in position order with a max-end segment tree over them, so each target finds the
+    clusters it intersects without scanning all clusters.
+
+    :param df: Source variants (accepted set) for one chromosome.
+    :param df_next: Target variants (variants to intersect with `df`) for one chromosome.
+    :param base_interval_flank: Minimum flank added to both ends of source intervals.
+    :param offsz_max: Maximum offset/svlen proportion. If not `None`, source flanks are expanded to
+        `SVLEN * offsz_max` when larger than `base_interval_flank`.
+    :param ro_min: Minimum reciprocal overlap. If not `None`, target insertions span `POS` to `POS + SVLEN`.
+
+    :return: A list of tuples, one for each cluster with at least one target variant, where the first element is a set
+        of source variant IDs and the second element is a set of target variant IDs.
+    """
 
-                sys.stderr.flush()
-                sys.stdout.flush()
+    if df.shape[0] == 0 or df_next.shape[0] == 0:
+        return []
 
-                # Check for exceptions
-                for df_support in df_support_list:
-                    if issubclass(df_support.__class__, Exception):
-                        raise df_support
+    # Source intervals
+    src_pos = df['POS'].values
 
-                # Check for null output
-                n_fail = np.sum([val is None for val in df_support_list])
+    if offsz_max is not None:
+        interval_flank = np.maximum(base_interval_flank, df['SVLEN'].values * offsz_max)
+    else:
+        interval_flank = base_interval_flank
 
-                if n_fail > 0:
-                    raise RuntimeError('Failed merging {} of {} record groups'.format(n_fail, len(df_support_list)))
+    src_begin = src_pos - interval_flank
+    src_end = np.where(df['SVTYPE'].values != 'INS', df['END'].values, src_pos + 1) + interval_flank
 
-                # Merge supporting dataframes
-                df_support = pd.concat(df_support_list, axis=0, sort=False).reset_index(drop=True)
+    # Target intervals
+    tgt_begin = df_next['POS'].values
 
-                # Clean up
-                del df_support_list
+    if ro_min is not None:
+        tgt_end = np.where(
+            df_next['SVTYPE'].values != 'INS', df_next['END'].values, tgt_begin + df_next['SVLEN'].values
+        )
+    else:
+        tgt_end = df_next['END'].values
+
+    # One slot per source variant in begin order. A cluster is stored in the slot of its first source interval, which
+    # is also the cluster begin. Slots merged into another cluster are cleared (end set to -inf).
+    slot_order = np.argsort(src_begin, kind='stable')
+
+    slot_begin = src_begin[slot_order]
+    slot_src = [{var_id} for var_id in df['ID'].values[slot_order]]
+    slot_tgt = [set() for _ in range(len(slot_src))]
+
+    # Max-end segment tree over slots (leaves at tree_size + slot)
+    tree_size = 1 << (len(slot_src) - 1).bit_length()
 
+    tree_end = [-np.inf] * (2 * tree_size)
+    tree_end[tree_size:tree_size + len(slot_src)] = src_end[slot_order].tolist()
+
+    for node in range(tree_size - 1, 0, -1):
+        tree_end[node] = max(tree_end[2 * node], tree_end[2 * node + 1])
+
+    # Number of slots beginning before each target interval ends
+    tgt_slot_count = np.searchsorted(slot_begin, tgt_end, side='left')
+
+    for pos, end, slot_count, var_id in zip(
+            tgt_begin.tolist(), tgt_end.tolist(), tgt_slot_count.tolist(), df_next['ID'].values
+    ):
+        if pos >= end or slot_count == 0:
+            continue
+
+        # Find clusters in slots [0, slot_count) ending after pos
+        slot_list = list()
+        node_stack = [(1, 0, tree_size)]
+
+        while node_stack:
+            node, node_lo, node_hi = node_stack.pop()
+
+            if node_lo >= slot_count or tree_end[node] <= pos:
+                continue
+
+            if node >= tree_size:
+                slot_list.append(node - tree_size)
             else:
-                df_support = pd.DataFrame(columns=['ID', 'TARGET_ID', 'OFFSET', 'RO', 'SZRO', 'OFFSZ', 'MATCH'])
+                node_mid = (node_lo + node_hi) // 2
+                node_stack.append((2 * node + 1, node_mid, node_hi))
+                node_stack.append((2 * node, node_lo, node_mid))
 
-            # Add to list (one list item per chromosome)
-            df_support_list_chrom.append(df_support)
+        if not slot_list:
+            continue
 
-            # Clean up
-            del record_pair_list
+        # Join clusters into the first slot
+        slot = min(slot_list)
+        cluster_end = max(tree_end[tree_size + slot_merge] for slot_merge in slot_list)
 
-        # Merge chromosomes and return
-        df_support = pd.concat(df_support_list_chrom, axis=0)
-        del df_support_list_chrom
+        for slot_merge in slot_list:
+            if slot_merge != slot:
+                slot_src[slot] |= slot_src[slot_merge]
+                slot_tgt[slot] |= slot_tgt[slot_merge]
 
-    else:
-        df_support = svpoplib.svlenoverlap.nearest_by_svlen_overlap(
-            df_source=df,
-            df_target=df_next,
-            ro_min=ro_min,
-            szro_min=szro_min,
-            offset_max=offset_max,
-            offsz_max=offsz_max,
-            priority=['RO', 'SZRO', 'OFFSET', 'OFFSZ', 'MATCH'],
-            threads=threads,
-            match_ref=match_ref,
-            match_alt=match_alt
-        )
+                slot_src[slot_merge] = None
+                slot_tgt[slot_merge] = None
 
-    return df_support if df_support.shape[0] > 0 else None
+            tree_end[tree_size + slot_merge] = cluster_end if slot_merge == slot else -np.inf
+
+            node = (tree_size + slot_merge) // 2
+
+            while node > 0:
+                tree_end[node] = max(tree_end[2 * node], tree_end[2 * node + 1])
+                node //= 2
+
+        slot_tgt[slot].add(var_id)
+
+    return [
+        (src_set, tgt_set) for src_set, tgt_set in zip(slot_src, slot_tgt) if tgt_set
+    ]
 
 
 def get_support_table_exact(df, df_next, align_match_prop=None, aligner=None, match_ref=None, match_alt=None):
@@ -1169,28 +1278,31 @@ def get_support_table_exact(df, df_next, align_match_prop=None, aligner=None, ma
     # Set columns to sort by
     sort_cols = ['#CHROM', 'POS', 'SVLEN']
 
+    df_col_set = set(df.columns)
+    df_next_col_set = set(df_next.columns)
+
     # Set match_ref
     if match_ref is None:
-        match_ref = 'REF' in df.columns or 'REF' in df_next.columns
+        match_ref = 'REF' in df_col_set or 'REF' in df_next_col_set
 
     if match_ref:
-        if 'REF' not in df.columns:
+        if 'REF' not in df_col_set:
             raise RuntimeError('Cannot match REF for exact match intersect: No REF column in dataframe (df)')
 
-        if 'REF' not in df_next.columns:
+        if 'REF' not in df_next_col_set:
             raise RuntimeError('Cannot match REF for exact match intersect: No REF column in dataframe (df_next)')
 
         sort_cols += ['REF']
 
     # Set match_alt
     if match_alt is None:
-        match_alt = 'ALT' in df.columns or 'ALT' in df_next.columns
+        match_alt = 'ALT' in df_col_set or 'ALT' in df_next_col_set
 
     if match_alt:
-        if 'ALT' not in df.columns:
+        if 'ALT' not in df_col_set:
             raise RuntimeError('Cannot match ALT for exact match intersect: No ALT column in dataframe (df)')
 
-        if 'ALT' not in df_next.columns:
+        if 'ALT' not in df_next_col_set:
             raise RuntimeError('Cannot match ALT for exact match intersect: No ALT column in dataframe (df_next)')
 
         sort_cols += ['ALT']
@@ -1199,10 +1311,10 @@ def get_support_table_exact(df, df_next, align_match_prop=None, aligner=None, ma
     match_seq = align_match_prop is not None
 
     if match_seq:
-        if 'SEQ' not in df.columns:
+        if 'SEQ' not in df_col_set:
             raise RuntimeError('Cannot match sequences for exact match intersect: No SEQ column in dataframe (df)')
 
-        if 'SEQ' not in df_next.columns:
+        if 'SEQ' not in df_next_col_set:
             raise RuntimeError('Cannot match sequences for exact match intersect: No SEQ column in dataframe (df_next)')
 
         if aligner is None:
@@ -1210,61 +1322,95 @@ def get_support_table_exact(df, df_next, align_match_prop=None, aligner=None, ma
 
         sort_cols += ['SEQ']
 
-    max_match = np.nan  # Initialize - set during matches if match_seq, left as np.nan for the support table otherwise
-
     # Check for missing columns
-    missing_1 = [col for col in sort_cols if col not in df.columns]
-    missing_2 = [col for col in sort_cols if col not in df_next.columns]
+    missing_1 = [col for col in sort_cols if col not in df_col_set]
+    missing_2 = [col for col in sort_cols if col not in df_next_col_set]
 
     if missing_1 or missing_2:
         raise RuntimeError('Missing columns for exact merging: df="{}", df_next="{}"'.format(
             ', '.join(missing_1), ', '.join(missing_2)
         ))
 
+    # Join on position and size if sequences are not matched. Within a set of records with the same keys, records are
+    # paired in table order (first with first, second with second, etc). A join does not need sorted tables, and
+    # pairing in table order is the same as pairing after a stable sort on the keys.
+    if not match_seq:
+        key_cols = [col for col in sort_cols if col != 'SEQ']
+
+        df_key = df[key_cols].assign(**{'#CHROM': df['#CHROM'].astype(str)})
+        df_next_key = df_next[key_cols].assign(**{'#CHROM': df_next['#CHROM'].astype(str)})
+
+        df_key['_KEY_RANK'] = df_key.groupby(key_cols, sort=False, dropna=False).cumcount()
+        df_next_key['_KEY_RANK'] = df_next_key.groupby(key_cols, sort=False, dropna=False).cumcount()
+
+        df_key['ID'] = df['ID'].values
+        df_next_key['TARGET_ID'] = df_next['ID'].values
+
+        df_join = df_key.merge(df_next_key, on=key_cols + ['_KEY_RANK'], how='inner')
+
+        if df_join.shape[0] == 0:
+            return None
+
+        return pd.DataFrame({
+            'ID': df_join['ID'].values,
+            'TARGET_ID': df_join['TARGET_ID'].values,
+            'OFFSET': 0,
+            'RO': 1,
+            'SZRO': 1,
+            'OFFSZ': 0,
+            'MATCH': np.nan
+        })
+
     # Sort
-    df = df.sort_values(sort_cols).copy()
-    df_next = df_next.sort_values(sort_cols).copy()
+    df = df.sort_values(sort_cols, kind='stable')
+    df_next = df_next.sort_values(sort_cols, kind='stable')
 
     # Find exact matches
-    index_1 = 0
-    index_2 = 0
+    id_1 = df['ID'].values
+    id_2 = df_next['ID'].values
 
-    max_index_1 = df.shape[0]
-    max_index_2 = df_next.shape[0]
+    seq_1 = df['SEQ'].values
+    seq_2 = df_next['SEQ'].values
 
-    df_match_list = list()
+    key_1, key_2 = get_exact_key_code(df, df_next, [col for col in sort_cols if col != 'SEQ'])
 
-    while index_1 < max_index_1 and index_2 < max_index_2:
+    # Keys found in both tables. Both tables are sorted by key, so records for each key are a contiguous range.
+    key_shared = np.intersect1d(key_1, key_2)
 
-        # Check by size and position
-        cmp_val = is_exact_match_no_seq(df.iloc[index_1], df_next.iloc[index_2], match_ref, match_alt)
+    key_begin_1 = np.searchsorted(key_1, key_shared, side='left')
+    key_end_1 = np.searchsorted(key_1, key_shared, side='right')
+    key_begin_2 = np.searchsorted(key_2, key_shared, side='left')
+    key_end_2 = np.searchsorted(key_2, key_shared, side='right')
 
-        if cmp_val < 0:
-            index_2 += 1
-            continue
+    # Matched record indices and match proportions (at most one match per record)
+    max_n = min(df.shape[0], df_next.shape[0])
 
-        if cmp_val > 0:
-            index_1 += 1
-            continue
+    match_index_1 = np.empty(max_n, dtype=np.int64)
+    match_index_2 = np.empty(max_n, dtype=np.int64)
+    match_prop = np.empty(max_n, dtype=np.float64)
 
-        # SEQ
-        if match_seq:
+    n_match = 0
 
-            # Find all matching rows - search for best align match
-            last_index = index_2 + 1
+    for begin_1, end_1, begin_2, end_2 in zip(key_begin_1, key_end_1, key_begin_2, key_end_2):
 
-            max_match = aligner.match_prop(df.iloc[index_1]['SEQ'], df_next.iloc[index_2]['SEQ'])
-            max_match_index = index_2
+        # df_next records not yet matched for this key (in order, best sequence matches are swapped to the front)
+        next_order = list(range(begin_2, end_2))
+
+        index_1 = begin_1
+        index_2 = 0
 
-            while last_index < max_index_2 and is_exact_match_no_seq(df.iloc[index_1], df_next.iloc[last_index], match_ref, match_alt) == 0:
+        while index_1 < end_1 and index_2 < len(next_order):
 
-                match_val = aligner.match_prop(df.iloc[index_1]['SEQ'], df_next.iloc[last_index]['SEQ'])
+            # SEQ: Search all matching rows for the best align match
+            match_list = aligner.match_prop_list(seq_1[index_1], seq_2[next_order[index_2:]])
 
-                if match_val > max_match:
-                    max_match = match_val
-                    max_match_index = last_index
+            max_match = match_list[0]
+            max_match_index = index_2
 
-                last_index += 1
+            for last_index in range(1, len(match_list)):
+                if match_list[last_index] > max_match:
+                    max_match = match_list[last_index]
+                    max_match_index = index_2 + last_index
 
             # No SEQ match for this row in df
             if max_match < align_match_prop:
@@ -1273,85 +1419,56 @@ def get_support_table_exact(df, df_next, align_match_prop=None, aligner=None, ma
 
             if max_match_index > index_2:
                 # Found multiple matches. Swap index_2 and max_match_index
-                swap_dict = {
-                    index_2: max_match_index,
-                    max_match_index: index_2
-                }
-
-                df_next = df_next.iloc[[swap_dict.get(i, i) for i in range(max_index_2)]].copy()
-
-        # Found match
-        df_match_list.append(pd.Series(
-            [
-                df.iloc[index_1]['ID'],
-                df_next.iloc[index_2]['ID'],
-                0, 1, 1, 0, max_match
-            ],
-            index=['ID', 'TARGET_ID', 'OFFSET', 'RO', 'SZRO', 'OFFSZ', 'MATCH']
-        ))
+                next_order[index_2], next_order[max_match_index] = next_order[max_match_index], next_order[index_2]
 
-        index_1 += 1
-        index_2 += 1
+            # Found match
+            match_index_1[n_match] = index_1
+            match_index_2[n_match] = next_order[index_2]
+            match_prop[n_match] = max_match
+
+            n_match += 1
+
+            index_1 += 1
+            index_2 += 1
 
     # Merge match dataframe
-    if df_match_list:
-        return pd.concat(df_match_list, axis=1).T
-    else:
+    if n_match == 0:
         return None
 
+    return pd.DataFrame({
+        'ID': id_1[match_index_1[:n_match]],
+        'TARGET_ID': id_2[match_index_2[:n_match]],
+        'OFFSET': 0,
+        'RO': 1,
+        'SZRO': 1,
+        'OFFSZ': 0,
+        'MATCH': match_prop[:n_match]
+    })
 
-def is_exact_match_no_seq(row_a, row_b, match_ref, match_alt):
-    """
-    Determine if two rows are exact matches. This function does not compare sequences, just size and position.
-
-    :param row_a: Row to compare.
-    :param row_b: Row to compare.
-    :param match_ref: Match REF column. Assumes rows have been checked to verify REF exists.
-    :param match_alt: Match ALT column. Assumes rows have been checked to verify ALT exists.
 
-    :return: True if rows are exact matches by size and position (does not evaluate sequence).
+def get_exact_key_code(df, df_next, key_cols):
     """
+    Encode exact-match key columns as integers. Codes are ordered by key values compared column by column in the
+    order of `key_cols` ("#CHROM", "POS", "SVLEN", then "REF" and "ALT" if matched), and records in `df` and `df_next`
+    with the same key values get the same code.
 
-    # CHROM
-    if row_b['#CHROM'] < row_a['#CHROM']:
-        return -1
-        # index_2 += 1
-        # continue
-
-    elif row_b['#CHROM'] > row_a['#CHROM']:
-        return 1
-        # index_1 += 1
-        # continue
-
-    # POS
-    if row_b['POS'] < row_a['POS']:
-        return -1
-
-    elif row_b['POS'] > row_a['POS']:
-        return 1
-
-    # SVLEN (END)
-    if row_b['SVLEN'] < row_a['SVLEN']:
-        return -1
-
-    elif row_b['SVLEN'] > row_a['SVLEN']:
-        return 1
+    :param df: Dataframe.
+    :param df_next: Next dataframe.
+    :param key_cols: Key columns.
 
-    # REF
-    if match_ref:
-        if row_b['REF'] < row_a['REF']:
-            return -1
+    :return: A tuple of two integer arrays with key codes for records in `df` and `df_next`.
+    """
 
-        elif row_b['REF'] > row_a['REF']:
-            return 1
+    col_code_list = list()
 
-    # ALT
-    if match_alt:
-        if row_b['ALT'] < row_a['ALT']:
-            return -1
+    for col in key_cols:
+        col_code_list.append(
+            pd.factorize(
+                np.concatenate([df[col].values.astype(object), df_next[col].values.astype(object)]),
+                sort=True, use_na_sentinel=False
+            )[0]
+        )
 
-        elif row_b['ALT'] > row_a['ALT']:
-            return 1
+    key_code = np.unique(np.column_stack(col_code_list), axis=0, return_inverse=True)[1].reshape(-1)
 
-    # Match
-    return 0
+    return key_code[:df.shape[0]], key_code[df.shape[0]:]
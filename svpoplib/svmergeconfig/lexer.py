@@ -1,5 +1,12 @@
 import ply.lex
 
+# Multipliers for integer suffixes (e.g. "2k" is 2000)
+INT_MULTIPLIER = {
+    'k': int(1e3),
+    'm': int(1e6),
+    'g': int(1e9)
+}
+
 class MergeLexer(object):
 
     def __init__(self, **kwdargs):
@@ -30,20 +37,10 @@ class MergeLexer(object):
 
     def parse_int(self, str_val):
 
-        str_val_lower = str_val.lower()
-
-        if str_val_lower.endswith('k'):
-            multiplier = int(1e3)
-            str_val = str_val[:-1]
-
-        elif str_val_lower.endswith('m'):
-            multiplier = int(1e6)
-            str_val = str_val[:-1]
+        multiplier = INT_MULTIPLIER.get(str_val[-1:].lower(), None)
 
-        elif str_val_lower.endswith('g'):
-            multiplier = int(1e9)
+        if multiplier is not None:
             str_val = str_val[:-1]
-
         else:
             multiplier = 1
 
@@ -140,32 +140,24 @@ class MergeConfig(object):
             # Process specification type
             spec = None
 
-            if self.strategy == 'nr':
-                if spec_ast['type'] == 'exact':
-                    spec = MergeSpecExact(spec_ast['val_list'])
-                elif spec_ast['type'] == 'ro':
-                    spec = MergeSpecRo(spec_ast['val_list'])
-                elif spec_ast['type'] == 'szro':
-                    spec = MergeSpecSzro(spec_ast['val_list'])
-                elif spec_ast['type'] == 'distance':
-                    spec = MergeSpecDistance(spec_ast['val_list'])
-                elif spec_ast['type'] == 'match':
-                    self.default_matcher = MergeSpecMatch(spec_ast['val_list'])
-                else:
-                    raise RuntimeError(f'MergeConfig {self.strategy}: Merge specification type at {index + 1} is unknown: {spec_ast["type"]}')
-
-            elif self.strategy in {'nrsnv', 'nrsnp'}:
-                if spec_ast['type'] == 'exact':
-                    spec = MergeSpecExact(spec_ast['val_list'])
-                elif spec_ast['type'] == 'distance':
-                    raise RuntimeError('MergeSpecDistance is not yet implemented')
-                    spec = MergeSpecDistance(spec_ast['val_list'])
-                else:
-                    raise RuntimeError(f'MergeConfig {self.strategy}: Merge specification type at {index + 1} is unknown: {spec_ast["type"]}')
+            spec_class_dict = MERGE_SPEC_CLASS.get(self.strategy, None)
 
-            else:
+            if spec_class_dict is None:
                 raise RuntimeError(f'MergeConfig: Unrecognized strategy {self.strategy}')
 
+            spec_class = spec_class_dict.get(spec_ast['type'], None)
+
+            if spec_class is None:
+                raise RuntimeError(f'MergeConfig {self.strategy}: Merge specification type at {index + 1} is unknown: {spec_ast["type"]}')
+
+            if spec_class is MergeSpecDistance and self.refalt:
+                raise RuntimeError('MergeSpecDistance is not yet implemented')
+
+            if spec_class is MergeSpecMatch:
+                self.default_matcher = MergeSpecMatch(spec_ast['val_list'])
+            else:
+                spec = spec_class(spec_ast['val_list'])
+
             if spec is not None:
                 self.spec_list.append(spec)
 
@@ -519,15 +511,17 @@ class MergeSpecSzro(MergeSpec):
     Matches have a mandatory distance constraint
     """
 
+    PARAM_SPEC_LIST = [
+        ParamSpec('num', 0.5, 'szro', 0.0, False, 1.0, True),
+        ParamSpec('int_u', 200, 'dist', 0, True),
+        ParamSpec('num_u', None, 'szdist', 0.0, True)
+    ]
+
     def __init__(self, arg_list):
         super().__init__(
             'szro',
             arg_list,
-            [
-                ParamSpec('num', 0.5, 'szro', 0.0, False, 1.0, True),
-                ParamSpec('int_u', 200, 'dist', 0, True),
-                ParamSpec('num_u', None, 'szdist', 0.0, True)
-            ],
+            self.PARAM_SPEC_LIST,
             True
         )
 
@@ -544,15 +538,17 @@ class MergeSpecDistance(MergeSpec):
     Merge by distance. May be restricted by size RO and offset size. Like szro, but szro parameter may be unset.
     """
 
+    PARAM_SPEC_LIST = [
+        ParamSpec('num', None, 'szro', 0.0, False, 1.0, True),
+        ParamSpec('int', 500, 'dist', 0, True),
+        ParamSpec('num_u', None, 'szdist', 0.0, True)
+    ]
+
     def __init__(self, arg_list):
         super().__init__(
             'distance',
             arg_list,
-            [
-                ParamSpec('num', None, 'szro', 0.0, False, 1.0, True),
-                ParamSpec('int', 500, 'dist', 0, True),
-                ParamSpec('num_u', None, 'szdist', 0.0, True)
-            ],
+            self.PARAM_SPEC_LIST,
             True
         )
 
@@ -569,14 +565,16 @@ class MergeSpecRo(MergeSpec):
     merged calls, END is still POS + 1  for INS after intersects).
     """
 
+    PARAM_SPEC_LIST = [
+        ParamSpec('num', 0.5, 'ro', 0.0, False, 1.0, True),
+        ParamSpec('int_u', None, 'dist', 0, True)
+    ]
+
     def __init__(self, arg_list):
         super().__init__(
             'ro',
             arg_list,
-            [
-                ParamSpec('num', 0.5, 'ro', 0.0, False, 1.0, True),
-                ParamSpec('int_u', None, 'dist', 0, True)
-            ],
+            self.PARAM_SPEC_LIST,
             True
         )
 
@@ -599,20 +597,47 @@ class MergeSpecMatch(MergeSpec):
     Parameter set: Matcher specification objects.
     """
 
+    PARAM_SPEC_LIST = [
+        ParamSpec('num', DEFAULT_MATCHER_SCORE, 'score', 0.0, False, 1.0, True),
+        ParamSpec('num', 2.0, 'match', 0.0, False),
+        ParamSpec('num', -1.0, 'mismatch', None, None, 0.0, False),
+        ParamSpec('num', -1.0, 'open', None, None, 0.0, True),
+        ParamSpec('num', -0.25, 'extend', None, None, 0.0, True),
+        ParamSpec('int_u', 4000, 'limit', 0, True),
+        ParamSpec('int', 9, 'ksize', 1, True)
+    ]
+
     def __init__(self, arg_list):
         super().__init__(
             'match',
             arg_list,
-            [
-                ParamSpec('num', DEFAULT_MATCHER_SCORE, 'score', 0.0, False, 1.0, True),
-                ParamSpec('num', 2.0, 'match', 0.0, False),
-                ParamSpec('num', -1.0, 'mismatch', None, None, 0.0, False),
-                ParamSpec('num', -1.0, 'open', None, None, 0.0, True),
-                ParamSpec('num', -0.25, 'extend', None, None, 0.0, True),
-                ParamSpec('int_u', 4000, 'limit', 0, True),
-                ParamSpec('int', 9, 'ksize', 1, True),
-            ],
+            self.PARAM_SPEC_LIST,
             False
         )
 
         return
+
+
+#
+# Specification types
+#
+
+# Specification classes for each strategy keyed by specification type name. A "match" specification sets the default
+# matcher for all specifications without one.
+MERGE_SPEC_CLASS = {
+    'nr': {
+        'exact': MergeSpecExact,
+        'ro': MergeSpecRo,
+        'szro': MergeSpecSzro,
+        'distance': MergeSpecDistance,
+        'match': MergeSpecMatch
+    },
+    'nrsnv': {
+        'exact': MergeSpecExact,
+        'distance': MergeSpecDistance
+    },
+    'nrsnp': {
+        'exact': MergeSpecExact,
+        'distance': MergeSpecDistance
+    }
+}
@@ -551,13 +551,13 @@ def args_to_dict(filter_arg):
     filter_arg = filter_arg.strip()
 
     # Parse arguments as a colon separated list where each element may have an assignment
-    for filter_avp in re.split('\s*:\s*', filter_arg):
+    for filter_avp in filter_arg.split(':'):
 
         # Split on =
-        tok = re.split('\s*=\s*', filter_avp, 1)
+        tok = filter_avp.split('=', 1)
 
-        filter_attr = tok[0]
-        filter_val = tok[1] if len(tok) > 1 else None
+        filter_attr = tok[0].strip()
+        filter_val = tok[1].strip() if len(tok) > 1 else None
 
         # Assign to arg_dict
         if filter_attr in spec_args:
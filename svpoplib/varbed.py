@@ -2,11 +2,15 @@
 Utilities for handling variants in BED format.
 """
 
-import collections
+import numpy as np
 import pandas as pd
 import re
 
 
+# Separates alleles in a genotype (GT field)
+GT_SPLIT_RE = re.compile(r'[|/]')
+
+
 def bcftools_query_to_tsv(df, sample, strict_sample=False, filter_gt=True, multi_gt_override=False):
     """
     Process a table output from `bcftools query`. Correct column names and extract a target sample.
@@ -27,7 +31,7 @@ def bcftools_query_to_tsv(df, sample, strict_sample=False, filter_gt=True, multi
     df.columns = [re.sub(r'^(#?)\s*\[[^\]]+\](.*)$', r'\1\2', col) for col in df.columns]
 
     if len(set(df.columns)) != df.shape[1]:
-        dup_cols = [col for col, count in collections.Counter(df.columns).items() if count > 1]
+        dup_cols = list(df.columns[df.columns.duplicated()].unique())
 
         raise RuntimeError('Fonud duplicate column names before sample filtering: {}'.format(', '.join(sorted(dup_cols))))
 
@@ -69,13 +73,13 @@ def bcftools_query_to_tsv(df, sample, strict_sample=False, filter_gt=True, multi
     df.columns = [col if ':' not in col else col.rsplit(':', 1)[1] for col in df.columns]
 
     if len(set(df.columns)) != df.shape[1]:
-        dup_cols = [col for col, count in collections.Counter(df.columns).items() if count > 1]
+        dup_cols = list(df.columns[df.columns.duplicated()].unique())
 
         raise RuntimeError('Fonud duplicate column names after sample filtering: {}'.format(', '.join(sorted(dup_cols))))
 
     if filter_gt:
         if 'GT' in df.columns:
-            df = df.loc[df['GT'].apply(gt_has_alt)]
+            df = df.loc[gt_has_alt_array(df['GT'])]
 
         elif vcf_sample_count > 1:
             raise RuntimeError(f'Cannot filter on GT column for a VCF with {vcf_sample_count} samples: No GT columns to filter')
@@ -95,7 +99,7 @@ def gt_has_alt(gt):
     if gt is None or pd.isnull(gt):
         return False
 
-    for val in re.split(r'\||\/', gt):
+    for val in GT_SPLIT_RE.split(gt):
         if val == '.':
             continue
 
@@ -108,3 +112,17 @@ def gt_has_alt(gt):
 
     return False
 
+
+def gt_has_alt_array(gt):
+    """
+    Vectorized `gt_has_alt()` for a column of genotypes. Each distinct genotype is parsed once by `gt_has_alt()`.
+
+    :param gt: Series of genotypes (GT field).
+
+    :return: A boolean array with `True` for each genotype with an alternate allele.
+    """
+
+    # Parse each distinct genotype once (missing values are coded as -1 and map to the appended False)
+    gt_code, gt_unique = pd.factorize(np.asarray(gt, dtype=object))
+
+    return np.append([gt_has_alt(val) for val in gt_unique], False).astype(bool)[gt_code]
@@ -2,8 +2,8 @@
 Variant processing and comparison functions.
 """
 
-import collections
-import intervaltree
+import functools
+import heapq
 import multiprocessing
 import numpy as np
 import os
@@ -13,6 +13,19 @@ import re
 import svpoplib
 
 
+# Columns returned by vcf_fields_to_seq()
+VCF_FIELDS_COLS = ['POS', 'END', 'VARTYPE', 'SVTYPE', 'SVLEN', 'SEQ', 'REF', 'ALT']
+
+# Sequence of bases not starting or ending with N (malformed REF/ALT fixes in vcf_fields_to_seq())
+SEQ_N_FLANK_RE = re.compile('^(?![Nn])[ACGTNacgtn]+(?<![Nn])$')
+
+# Low-cardinality columns stored as categoricals by normalize_variant_dtypes()
+CATEGORY_COLS = ['#CHROM', 'SVTYPE']
+
+# Minimum number of active records for comparing them as arrays in nr_interval_merge()
+NR_MERGE_ARRAY_MIN = 16
+
+
 def reciprocal_overlap(begin_a, end_a, begin_b, end_b):
     """
     Get reciprocal overlap of two intervals. Intervals are expected to be half-open coordinates (length is end - start).
@@ -36,7 +49,51 @@ def reciprocal_overlap(begin_a, end_a, begin_b, end_b):
     ])
 
 
-def var_nearest(df_a, df_b, ref_alt=False, verbose=False):
+def reciprocal_overlap_array(begin_a, end_a, begin_b, end_b):
+    """
+    Get reciprocal overlap of intervals with array arguments. Arguments may be scalars or numpy arrays (broadcast against
+    each other). Intervals are expected to be half-open coordinates (length is end - start).
+
+    :param begin_a: Begin of intervals a.
+    :param end_a: End of intervals a.
+    :param begin_b: Begin of intervals b.
+    :param end_b: End of intervals b.
+
+    :return: An array of values between 0 and 1 (0 where intervals do not overlap).
+    """
+
+    overlap = np.minimum(end_a, end_b) - np.maximum(begin_a, begin_b)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ro = np.minimum(
+            overlap / (end_a - begin_a),
+            overlap / (end_b - begin_b)
+        )
+
+    return np.where(overlap < 0, 0.0, ro)
+
+
+def normalize_variant_dtypes(df):
+    """
+    Store low-cardinality variant columns ("#CHROM" and "SVTYPE") as categoricals so equality tests and groupby
+    operations run on integer codes. Columns that are missing or already categorical are left unchanged.
+
+    :param df: Variant dataframe.
+
+    :return: `df` if no columns were converted, or a copy of `df` with converted columns.
+    """
+
+    convert_cols = [
+        col for col in CATEGORY_COLS if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype)
+    ]
+
+    if not convert_cols:
+        return df
+
+    return df.astype({col: 'category' for col in convert_cols})
+
+
+def var_nearest(df_a, df_b, ref_alt=False, verbose=False, threads=1):
     """
     For each variant in `df_a`, get the nearest variant in `df_b`. All `df_a` variants are in the output except those
     where `df_b` has no variant call on the same chromosome.
@@ -45,6 +102,7 @@ def var_nearest(df_a, df_b, ref_alt=False, verbose=False):
     :param df_b: Variants to match against.
     :param ref_alt: Find distance to nearest variant where "REF" and "ALT" columns match (for SNVs of the same type).
     :param verbose: Print status information.
+    :param threads: Number of chromosomes to process in parallel.
 
     :return: A dataframe with columns "ID_A", "ID_B", and "DISTANCE". If a variant from `df_b` is downstream, the
         distance is positive.
@@ -58,78 +116,152 @@ def var_nearest(df_a, df_b, ref_alt=False, verbose=False):
         if 'REF' not in df_b.columns or 'ALT' not in df_b.columns:
             raise RuntimeError('Missing required column(s) in dataframe B for ref-alt comparisons: REF, ALT')
 
-    # Process each chromosome
-    match_list = list()
+    # Get chromosome subsets
+    df_a = normalize_variant_dtypes(df_a)
+    df_b = normalize_variant_dtypes(df_b)
+
+    df_a_group = dict(iter(df_a.groupby('#CHROM', sort=False, observed=True)))
+    df_b_group = dict(iter(df_b.groupby('#CHROM', sort=False, observed=True)))
+
+    job_list = list()
 
-    for chrom in sorted(set(df_a['#CHROM'])):
+    for chrom in sorted(df_a_group.keys()):
         if verbose:
             print('Chrom: ' + chrom)
 
-        # Subset by chromosome
-        df_b_chrom = df_b.loc[df_b['#CHROM'] == chrom]
-
-        if df_b_chrom.shape[0] == 0:
+        if chrom not in df_b_group:
             continue
 
-        df_a_chrom = df_a.loc[df_a['#CHROM'] == chrom]
+        job_list.append((df_a_group[chrom], df_b_group[chrom], ref_alt))
+
+    # Process each chromosome
+    if threads > 1 and len(job_list) > 1:
+        with multiprocessing.Pool(min(threads, len(job_list))) as pool:
+            match_list = pool.starmap(_var_nearest_chrom, job_list)
+    else:
+        match_list = [_var_nearest_chrom(*job) for job in job_list]
+
+    match_list = [match for match in match_list if match is not None]
+
+    # Return merged dataframe
+    if not match_list:
+        return pd.DataFrame([], columns=['ID_A', 'ID_B', 'DISTANCE'])
+
+    return pd.DataFrame({
+        'ID_A': np.concatenate([match[0] for match in match_list]),
+        'ID_B': np.concatenate([match[1] for match in match_list]),
+        'DISTANCE': np.concatenate([match[2] for match in match_list])
+    })
+
+
+def _var_nearest_chrom(df_a_chrom, df_b_chrom, ref_alt):
+    """
+    Get the nearest variant in `df_b_chrom` for each variant in `df_a_chrom` (see `var_nearest()`).
+
+    :param df_a_chrom: Variants to match on one chromosome.
+    :param df_b_chrom: Variants to match against on the same chromosome.
+    :param ref_alt: Find distance to nearest variant where "REF" and "ALT" columns match.
+
+    :return: A tuple of arrays for ID_A, ID_B, and DISTANCE, or `None` if no variants were matched.
+    """
+
+    id_a_list = list()
+    id_b_list = list()
+    dist_list = list()
 
-        # Get a set of REF-ALT tuples from df_a (if ref_alt)
+    # Get sorted REF-ALT tuples from df_a and the rows for each in df_a and df_b (if ref_alt). Sorting keeps the output
+    # order independent of string hashing, which may differ between worker processes.
+    if ref_alt:
+        ref_alt_index_a = df_a_chrom.groupby(['REF', 'ALT'], sort=False).indices
+        ref_alt_index_b = df_b_chrom.groupby(['REF', 'ALT'], sort=False).indices
+
+        ref_alt_list = sorted(ref_alt_index_a.keys())
+    else:
+        ref_alt_list = [(None, None)]
+
+    # Process each subset for this chromosome
+    for ref, alt in ref_alt_list:
+
+        # Separate on REF/ALT (if ref_alt is True)
         if ref_alt:
-            ref_alt_set = set(df_a_chrom.loc[:, ['REF', 'ALT']].apply(tuple, axis=1))
+            if (ref, alt) not in ref_alt_index_b:
+                continue
+
+            df_a_sub = df_a_chrom.iloc[ref_alt_index_a[(ref, alt)]]
+            df_b_sub = df_b_chrom.iloc[ref_alt_index_b[(ref, alt)]]
         else:
-            ref_alt_set = {(None, None)}
+            df_a_sub = df_a_chrom
+            df_b_sub = df_b_chrom
 
-        # Process each subset for this chromosome
-        for ref, alt in ref_alt_set:
+        if df_a_sub.shape[0] == 0 or df_b_sub.shape[0] == 0:
+            continue
 
-            # Separate on REF/ALT (if ref_alt is True)
-            if ref is not None and alt is not None:
-                df_a_sub = df_a_chrom.loc[(df_a_chrom['REF'] == ref) & (df_a_chrom['ALT'] == alt)]
-                df_b_sub = df_b_chrom.loc[(df_b_chrom['REF'] == ref) & (df_b_chrom['ALT'] == alt)]
-            else:
-                df_a_sub = df_a_chrom
-                df_b_sub = df_b_chrom
+        # Get arrays from b for comparisons
+        pos_array = np.array(df_b_sub['POS'])
+        end_array = np.array(df_b_sub['END'])
+        id_array = np.array(df_b_sub['ID'])
 
-            if df_a_sub.shape[0] == 0 or df_b_sub.shape[0] == 0:
-                continue
+        # Find nearest records for all records on chromosome
+        a_pos = np.array(df_a_sub['POS'])
+        a_end = np.array(df_a_sub['END'])
 
-            # Get arrays from b for comparisons
-            pos_array = np.array(df_b_sub['POS'])
-            end_array = np.array(df_b_sub['END'])
-            id_array = np.array(df_b_sub['ID'])
+        min_pos_index = _nearest_index(pos_array, a_pos)
+        min_end_index = _nearest_index(end_array, a_end)
 
-            # Process each record on chromosome
-            for index, row in df_a_sub.iterrows():
+        min_pos = a_pos - pos_array[min_pos_index]
+        min_end = a_end - end_array[min_end_index]
 
-                min_pos_index = np.argmin(np.abs(pos_array - row['POS']))
-                min_end_index = np.argmin(np.abs(end_array - row['END']))
+        # Make intersect records
+        is_pos = np.abs(min_pos) < np.abs(min_end)
 
-                min_pos = row['POS'] - pos_array[min_pos_index]
-                min_end = row['END'] - end_array[min_end_index]
+        id_a_list.append(np.array(df_a_sub['ID']))
+        id_b_list.append(id_array[np.where(is_pos, min_pos_index, min_end_index)])
+        dist_list.append(np.where(is_pos, min_pos, min_end))
 
-                # Make intersect record
-                if np.abs(min_pos) < np.abs(min_end):
-                    match_list.append(pd.Series(
-                        [
-                            row['ID'],
-                            id_array[min_pos_index],
-                            min_pos,
-                        ],
-                        index=['ID_A', 'ID_B', 'DISTANCE']
-                    ))
+    if not id_a_list:
+        return None
 
-                else:
-                    match_list.append(pd.Series(
-                        [
-                            row['ID'],
-                            id_array[min_end_index],
-                            min_end,
-                        ],
-                        index=['ID_A', 'ID_B', 'DISTANCE']
-                    ))
+    return np.concatenate(id_a_list), np.concatenate(id_b_list), np.concatenate(dist_list)
 
-    # Return merged dataframe
-    return pd.concat(match_list, axis=1).T
+
+def _nearest_index(val_array, query_array):
+    """
+    For each value in `query_array`, get the index of the nearest value in `val_array`. If more than one value is
+    nearest, the lowest index is chosen (same as `np.argmin(np.abs(val_array - query))`).
+
+    :param val_array: Array of values to search (not empty).
+    :param query_array: Array of values to find.
+
+    :return: An array of indices into `val_array`, one for each element in `query_array`.
+    """
+
+    # Sort values. Within runs of equal values, the first element has the lowest index (stable sort)
+    val_order = np.argsort(val_array, kind='stable')
+    val_sorted = val_array[val_order]
+
+    max_index = val_sorted.shape[0] - 1
+
+    # Nearest value at or after each query (right) and before each query (left)
+    right_index = np.searchsorted(val_sorted, query_array, side='left')
+    left_index = np.searchsorted(val_sorted, val_sorted[np.maximum(right_index - 1, 0)], side='left')
+
+    has_right = right_index <= max_index
+    has_left = right_index > 0
+
+    right_index = np.minimum(right_index, max_index)
+
+    right_dist = np.abs(val_sorted[right_index] - query_array)
+    left_dist = np.abs(query_array - val_sorted[left_index])
+
+    right_val_index = val_order[right_index]
+    left_val_index = val_order[left_index]
+
+    # Choose nearest (lowest index if equal)
+    is_left = has_left & (
+        ~ has_right | (left_dist < right_dist) | ((left_dist == right_dist) & (left_val_index < right_val_index))
+    )
+
+    return np.where(is_left, left_val_index, right_val_index)
 
 
 def nr_interval_merge(df_chr, overlap=0.5):
@@ -143,28 +275,50 @@ def nr_interval_merge(df_chr, overlap=0.5):
     :return: Dataframe subset using the first record in a unique interval.
     """
 
-    index_list = list()  # Dataframe indices to return
+    pos = df_chr['POS'].values
+    end = df_chr['END'].values
+
+    if np.any(end <= pos):
+        raise RuntimeError('Cannot merge intervals: Found records with END <= POS')
 
-    interval_tree = intervaltree.IntervalTree()  # Tree of intervals
+    pos_list = pos.tolist()
+    end_list = end.tolist()
 
-    # Iterate rows
-    for index, row in df_chr.iterrows():
-        ri_match = False
+    # A record is redundant if it overlaps any record before it in the table. Sweep records in position order and
+    # compare each with all records it intersects, marking the later record (in table order) of any matching pair.
+    is_redundant = np.zeros(pos.shape[0], dtype=bool)
 
-        # Find matches
-        for interval in interval_tree[row['POS']:row['END']]:
-            if reciprocal_overlap(row['POS'], row['END'], interval.begin, interval.end) >= 0.50:
-                ri_match = True
-                break
+    active_heap = list()  # Records intersecting the current position (end, table index)
 
-        # Append to non-redundant records if no match
-        if not ri_match:
-            index_list.append(index)
+    for index in np.argsort(pos, kind='stable').tolist():
+        pos_index = pos_list[index]
+        end_index = end_list[index]
+        len_index = end_index - pos_index
 
-        # All records are added to the tree
-        interval_tree[row['POS']:row['END']] = True
+        while active_heap and active_heap[0][0] <= pos_index:
+            heapq.heappop(active_heap)
 
-    return df_chr.loc[index_list]
+        if len(active_heap) > NR_MERGE_ARRAY_MIN:
+            # Compare with all active records at once
+            index_active = np.array([val[1] for val in active_heap])
+
+            index_match = index_active[
+                reciprocal_overlap_array(pos_index, end_index, pos[index_active], end[index_active]) >= 0.50
+            ]
+
+            is_redundant[np.maximum(index_match, index)] = True
+
+        else:
+            # Reciprocal overlap inline: Active records start at or before pos_index and end after it
+            for end_active, index_active in active_heap:
+                overlap_len = min(end_index, end_active) - pos_index
+
+                if overlap_len / len_index >= 0.50 and overlap_len / (end_active - pos_list[index_active]) >= 0.50:
+                    is_redundant[max(index, index_active)] = True
+
+        heapq.heappush(active_heap, (end_index, index))
+
+    return df_chr.loc[list(df_chr.index[~ is_redundant])]
 
 
 def order_variant_columns(
@@ -249,7 +403,20 @@ def get_variant_id(df, apply_version=True, existing_id_set=None):
     :return: A Series of variant IDs for `df`.
     """
 
-    id_col = df.apply(get_variant_id_from_row, axis=1)
+    # Variant ID prefix ("CHROM-POS-SVTYPE-") followed by SVLEN or REF and ALT (SNVs)
+    id_col = (
+        df['#CHROM'].astype(str) + '-' + (df['POS'] + 1).astype(str) + '-' + df['SVTYPE'].astype(str) + '-'
+    ).astype(object)
+
+    is_snv = np.asarray(df['SVTYPE'] == 'SNV')
+
+    if not np.all(is_snv):
+        id_col.loc[~ is_snv] += df.loc[~ is_snv, 'SVLEN'].astype(str)
+
+    if np.any(is_snv):
+        id_col.loc[is_snv] += df.loc[is_snv, 'REF'].str.upper() + df.loc[is_snv, 'ALT'].str.upper()
+
+    id_col.name = None
 
     if apply_version:
         id_col = version_id(id_col, existing_id_set=existing_id_set)
@@ -266,15 +433,29 @@ def get_variant_id_from_row(row):
     :return: Variant ID.
     """
 
-    if row['SVTYPE'] != 'SNV':
-        return '{}-{}-{}-{}'.format(
-            row['#CHROM'], row['POS'] + 1, row['SVTYPE'], row['SVLEN']
-        )
+    return _fmt_variant_id(
+        row['#CHROM'], row['POS'], row['SVTYPE'], row.get('SVLEN'), row.get('REF'), row.get('ALT')
+    )
 
-    else:
-        return '{}-{}-{}-{}{}'.format(
-            row['#CHROM'], row['POS'] + 1, row['SVTYPE'], row['REF'].upper(), row['ALT'].upper()
-        )
+
+def _fmt_variant_id(chrom, pos, svtype, svlen, ref, alt):
+    """
+    Get variant ID from field values.
+
+    :param chrom: Chromosome.
+    :param pos: Variant position (0-based).
+    :param svtype: Variant type.
+    :param svlen: Variant length (ignored for SNVs).
+    :param ref: Reference base (SNVs only).
+    :param alt: Alternate base (SNVs only).
+
+    :return: Variant ID.
+    """
+
+    if svtype != 'SNV':
+        return f'{chrom}-{pos + 1}-{svtype}-{svlen}'
+
+    return f'{chrom}-{pos + 1}-{svtype}-{ref.upper()}{alt.upper()}'
 
 
 def vcf_fields_to_seq(row, pos_row='POS', ref_row='REF', alt_row='ALT'):
@@ -295,13 +476,68 @@ def vcf_fields_to_seq(row, pos_row='POS', ref_row='REF', alt_row='ALT'):
 
     if row is None:
         return pd.Series(
-            [np.nan] * 8,
-            index=['POS', 'END', 'VARTYPE', 'SVTYPE', 'SVLEN', 'SEQ', 'REF', 'ALT']
+            [np.nan] * len(VCF_FIELDS_COLS),
+            index=VCF_FIELDS_COLS
         )
 
-    pos = row[pos_row]
-    ref = row[ref_row].upper().strip()
-    alt = row[alt_row].upper().strip()
+    return pd.Series(
+        vcf_fields_to_seq_values(
+            row[pos_row], row[ref_row], row[alt_row],
+            svlen=row['SVLEN'] if 'SVLEN' in row else None,
+            end=row['END'] if 'END' in row else None,
+            seq=row['SEQ'] if 'SEQ' in row else np.nan,
+            name=row.name
+        ),
+        index=VCF_FIELDS_COLS
+    )
+
+
+def vcf_fields_to_seq_df(df, pos_row='POS', ref_row='REF', alt_row='ALT'):
+    """
+    Get calls for a table of VCF records (see `vcf_fields_to_seq()`).
+
+    :param df: Table of VCF records.
+    :param pos_row: Column name for the variant position (POS).
+    :param ref_row: Column name for the reference sequence (REF).
+    :param alt_row: Column name for the alternate sequence (ALT).
+
+    :return: Table of variant calls with "POS", "END", "VARTYPE", "SVTYPE", "SVLEN", "SEQ", "REF", "ALT" (same index
+        as `df`).
+    """
+
+    svlen_list = df['SVLEN'] if 'SVLEN' in df.columns else [None] * df.shape[0]
+    end_list = df['END'] if 'END' in df.columns else [None] * df.shape[0]
+    seq_list = df['SEQ'] if 'SEQ' in df.columns else [np.nan] * df.shape[0]
+
+    return pd.DataFrame(
+        [
+            vcf_fields_to_seq_values(pos, ref, alt, svlen, end, seq, name)
+            for name, pos, ref, alt, svlen, end, seq in zip(
+                df.index, df[pos_row], df[ref_row], df[alt_row], svlen_list, end_list, seq_list
+            )
+        ],
+        index=df.index,
+        columns=VCF_FIELDS_COLS
+    )
+
+
+def vcf_fields_to_seq_values(pos, ref, alt, svlen=None, end=None, seq=np.nan, name=None):
+    """
+    Get call for one VCF record and one sample from field values (see `vcf_fields_to_seq()`).
+
+    :param pos: Variant position (POS).
+    :param ref: Reference sequence (REF).
+    :param alt: Alternate sequence (ALT).
+    :param svlen: SVLEN for symbolic variants or `None` if there is no SVLEN field.
+    :param end: END for symbolic variants or `None` if there is no END field.
+    :param seq: Sequence for symbolic variants.
+    :param name: Record name reported in errors.
+
+    :return: A tuple of "POS", "END", "VARTYPE", "SVTYPE", "SVLEN", "SEQ", "REF", "ALT".
+    """
+
+    ref = ref.upper().strip()
+    alt = alt.upper().strip()
 
     # This function does not handle multiple alleles or missing ALTs (one variant per record)
     if ',' in alt:
@@ -311,10 +547,10 @@ def vcf_fields_to_seq(row, pos_row='POS', ref_row='REF', alt_row='ALT'):
         raise RuntimeError('Missing ALT in record')
 
     # Fix common malformed VCFs (Sniffles2)
-    if ref in {'N', 'n'} and re.match('^(?![Nn])[ACGTNacgtn]+(?<![Nn])$', alt) is not None:
+    if ref in {'N', 'n'} and SEQ_N_FLANK_RE.match(alt) is not None:
         alt = ref + alt
 
-    if alt in {'N', 'n'} and re.match('^(?![Nn])[ACGTNacgtn]+(?<![Nn])$', ref) is not None:
+    if alt in {'N', 'n'} and SEQ_N_FLANK_RE.match(ref) is not None:
         ref = alt + ref
 
     # Fix common malformed VCFs (SVIM-asm)
@@ -333,27 +569,22 @@ def vcf_fields_to_seq(row, pos_row='POS', ref_row='REF', alt_row='ALT'):
         svtype = alt[1:-1].split(':', 1)[0]
 
         if svtype not in {'INS', 'DEL', 'INV', 'DUP', 'CNV'}:
-            raise RuntimeError('Unrecognized symbolic variant type: {}: Row {}'.format(svtype, row.name))
+            raise RuntimeError('Unrecognized symbolic variant type: {}: Row {}'.format(svtype, name))
 
         # Get length
-        svlen = None
-
-        if 'SVLEN' in row:
-            try:
-                svlen = abs(int(row['SVLEN']))
-            except:
-                svlen = None
-        else:
+        try:
+            svlen = abs(int(svlen))
+        except:
             svlen = None
 
         if svlen is None:
-            if 'END' not in row:
-                raise RuntimeError('Missing or 0-length SVLEN and no END for symbolic SV: Row {}'.format(row.name))
+            if end is None:
+                raise RuntimeError('Missing or 0-length SVLEN and no END for symbolic SV: Row {}'.format(name))
 
             try:
-                svlen = abs(int(row['END'])) - pos
+                svlen = abs(int(end)) - pos
             except:
-                raise RuntimeError('Variant has no SVLEN and END is not an integer: {}: Row {}'.format(row['END'], row.name))
+                raise RuntimeError('Variant has no SVLEN and END is not an integer: {}: Row {}'.format(end, name))
 
         # Set variant type
         vartype = 'INDEL' if svlen < 50 else 'SV'
@@ -365,7 +596,6 @@ def vcf_fields_to_seq(row, pos_row='POS', ref_row='REF', alt_row='ALT'):
             end = pos + svlen
 
         # Sequence
-        seq = row['SEQ'] if 'SEQ' in row else np.nan
         alt = f'<{svtype}>'
 
     elif alt == '.':
@@ -386,24 +616,24 @@ def vcf_fields_to_seq(row, pos_row='POS', ref_row='REF', alt_row='ALT'):
         end = pos + 1
         svlen = 0
 
-    elif re.match('^[a-zA-Z]+$', alt) and re.match('^[a-zA-Z]+$', ref):
+    elif alt.isascii() and alt.isalpha() and ref.isascii() and ref.isalpha():
 
         min_len = min(len(ref), len(alt))
 
+        # Count shared bases on the left, then on the right of the remaining bases
         trim_left = 0
 
-        # Trim left
-        while min_len and ref[0] == alt[0]:
-            ref = ref[1:]
-            alt = alt[1:]
+        while trim_left < min_len and ref[trim_left] == alt[trim_left]:
             trim_left += 1
-            min_len -= 1
 
-        # Trim right
-        while min_len and ref[-1] == alt[-1]:
-            ref = ref[:-1]
-            alt = alt[:-1]
-            min_len -= 1
+        trim_right = 0
+
+        while trim_right < min_len - trim_left and ref[-1 - trim_right] == alt[-1 - trim_right]:
+            trim_right += 1
+
+        # Trim
+        ref = ref[trim_left:len(ref) - trim_right]
+        alt = alt[trim_left:len(alt) - trim_right]
 
         # Check variant type
         if ref == '' and alt != '':
@@ -446,10 +676,7 @@ def vcf_fields_to_seq(row, pos_row='POS', ref_row='REF', alt_row='ALT'):
     else:
         raise RuntimeError(f'Unknown variant type: REF="{ref}", ALT="{alt}"')
 
-    return pd.Series(
-        [pos, end, vartype, svtype, svlen, seq, ref, alt],
-        index=['POS', 'END', 'VARTYPE', 'SVTYPE', 'SVLEN', 'SEQ', 'REF', 'ALT']
-    )
+    return pos, end, vartype, svtype, svlen, seq, ref, alt
 
 
 def get_filter_bed(filter_name, ucsc_ref_name, config, svpop_dir):
@@ -467,8 +694,23 @@ def get_filter_bed(filter_name, ucsc_ref_name, config, svpop_dir):
     :return: Filter path.
     """
 
-    # Get path
-    filter_path = config.get('filter', dict()).get(filter_name, None)
+    return _resolve_filter_bed(
+        filter_name, ucsc_ref_name, config.get('filter', dict()).get(filter_name, None), svpop_dir
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_filter_bed(filter_name, ucsc_ref_name, filter_path, svpop_dir):
+    """
+    Resolve and check a filter path for `get_filter_bed()`. Results are cached, errors are not.
+
+    :param filter_name: Fliter name.
+    :param ucsc_ref_name: Name of the UCSC reference (e.g. "hg38").
+    :param filter_path: Filter path from the config or `None` if the filter is not in the config.
+    :param svpop_dir: SV-Pop pipeline directory.
+
+    :return: Filter path.
+    """
 
     if filter_path is None:
         filter_path = os.path.join(
@@ -542,6 +784,27 @@ def left_homology(pos_tig, seq_tig, seq_sv):
 
     hom_len = 0
 
+    # Compare blocks of bases (doubling in size while they match). Requires an unambiguous SV sequence so that matching
+    # blocks cannot contain ambiguous contig bases.
+    if svlen > 0 and pos_tig < len(seq_tig) and not seq_sv.strip('ACGT'):
+        seq_sv_rev = seq_sv[::-1]
+        block_len = 16
+
+        while hom_len <= pos_tig:
+            block_len = min(block_len, pos_tig + 1 - hom_len)
+            sv_index = hom_len % svlen
+
+            tig_block = seq_tig[pos_tig - hom_len - block_len + 1:pos_tig - hom_len + 1][::-1]
+            sv_block = (seq_sv_rev * ((sv_index + block_len) // svlen + 1))[sv_index:sv_index + block_len]
+
+            if tig_block != sv_block:
+                return hom_len + _first_mismatch(tig_block, sv_block)
+
+            hom_len += block_len
+            block_len *= 2
+
+        return hom_len
+
     while hom_len <= pos_tig:  # Do not shift off the edge of a contig.
         seq_tig_base = seq_tig[pos_tig - hom_len]
 
@@ -599,6 +862,26 @@ def right_homology(pos_tig, seq_tig, seq_sv):
     hom_len = 0
     pos_tig_limit = tig_len - pos_tig
 
+    # Compare blocks of bases (doubling in size while they match). Requires an unambiguous SV sequence so that matching
+    # blocks cannot contain ambiguous contig bases.
+    if svlen > 0 and pos_tig >= 0 and not seq_sv.strip('ACGT'):
+        block_len = 16
+
+        while hom_len < pos_tig_limit:
+            block_len = min(block_len, pos_tig_limit - hom_len)
+            sv_index = hom_len % svlen
+
+            tig_block = seq_tig[pos_tig + hom_len:pos_tig + hom_len + block_len]
+            sv_block = (seq_sv * ((sv_index + block_len) // svlen + 1))[sv_index:sv_index + block_len]
+
+            if tig_block != sv_block:
+                return hom_len + _first_mismatch(tig_block, sv_block)
+
+            hom_len += block_len
+            block_len *= 2
+
+        return hom_len
+
     while hom_len < pos_tig_limit:  # Do not shift off the edge of a contig.
         seq_tig_base = seq_tig[pos_tig + hom_len]
 
@@ -620,6 +903,34 @@ def right_homology(pos_tig, seq_tig, seq_sv):
     return hom_len
 
 
+def _first_mismatch(seq_a, seq_b):
+    """
+    Find the first mismatch between two sequences of the same length. The mismatching half of the sequence is found by
+    slice comparisons until 8 or fewer bases remain, then the mismatch is found base by base.
+
+    :param seq_a: Sequence.
+    :param seq_b: Sequence differing from `seq_a`.
+
+    :return: Index of the first mismatch.
+    """
+
+    index_lo = 0
+    index_hi = len(seq_a)
+
+    while index_hi - index_lo > 8:
+        index_mid = (index_lo + index_hi) // 2
+
+        if seq_a[index_lo:index_mid] == seq_b[index_lo:index_mid]:
+            index_lo = index_mid
+        else:
+            index_hi = index_mid
+
+    while seq_a[index_lo] == seq_b[index_lo]:
+        index_lo += 1
+
+    return index_lo
+
+
 def version_id(id_col, existing_id_set=None):
     """
     Take a column of IDs (Pandas Series object, `id_col`) and transform all duplicate IDs by appending "." and an
@@ -641,57 +952,48 @@ def version_id(id_col, existing_id_set=None):
         versioned.
     """
 
-    # Get counts
-    id_count = collections.Counter()
+    # Find duplicate IDs
+    is_dup = id_col.duplicated(keep=False)
 
     if existing_id_set is not None:
-        id_count.update(existing_id_set)
+        is_dup |= id_col.isin(existing_id_set)
 
-    id_count.update(id_col)
-
-    dup_set = {val for val, count in id_count.items() if count > 1}
+    dup_set = set(id_col.loc[is_dup])
 
     if len(dup_set) == 0:
         return id_col
 
     # Create a map: old name to new name
-    id_col = id_col.copy()
-    id_set = set(id_col) - dup_set
+    id_list = id_col.tolist()
+    id_set = set(id_list) - dup_set
 
     if existing_id_set is not None:
         id_set |= existing_id_set
 
-    for index in range(id_col.shape[0]):
-        name = id_col.iloc[index]
+    # Split duplicate IDs into a base name and the first version to try (version after "." plus 1 if present, 1 by
+    # default)
+    dup_index = np.flatnonzero(is_dup.values)
 
-        if name in dup_set:
+    df_tok = id_col.iloc[dup_index].astype(str).str.extract(r'^(.*)\.(\d+)$')
 
-            # Get current variant version (everything after "." if present, 1 by default)
-            if not re.match(r'.*\.\d+$', name):
-                name_version = 1
-                tok = [name]
+    base_list = df_tok[0].where(~ df_tok[0].isnull(), id_col.iloc[dup_index]).tolist()
+    version_list = (df_tok[1].fillna('0').astype(int) + 1).tolist()
 
-            else:
-                try:
-                    tok = name.rsplit('.', 1)
-                    name_version = int(tok[1]) + 1
+    for index, base_name, name_version in zip(dup_index.tolist(), base_list, version_list):
 
-                except ValueError:
-                    raise RuntimeError(f'Error de-duplicating variant ID field: Split "{name}" on "." and expected to find an integer at the end')
+        # Find unique name
+        new_name = f'{base_name}.{name_version}'
 
-            # Find unique name
-            new_name = '.'.join([tok[0], str(name_version)])
+        while new_name in id_set:
+            name_version += 1
+            new_name = f'{base_name}.{name_version}'
 
-            while new_name in id_set:
-                name_version += 1
-                new_name = '.'.join([tok[0], str(name_version)])
-
-            # Add to map
-            id_col.iloc[index] = new_name
-            id_set.add(new_name)
+        # Add to map
+        id_list[index] = new_name
+        id_set.add(new_name)
 
     # Append new variants
-    return id_col
+    return pd.Series(id_list, index=id_col.index, name=id_col.name, dtype=object)
 
 
 def check_unique_ids(df, message=''):
@@ -718,8 +1020,10 @@ def check_unique_ids(df, message=''):
         raise RuntimeError(f'Unrecognized data type for check_unique_ids(): Expected Pandas DataFrame or Series: {df.__class__}')
 
     # Check for unique IDs
-    if len(set(id_row)) < id_row.shape[0]:
-        dup_id_set = [val for val, count in collections.Counter(id_row).items() if count > 1]
+    is_dup = id_row.duplicated(keep=False)
+
+    if np.any(is_dup):
+        dup_id_set = list(id_row.loc[is_dup].unique())
 
         if message is None:
             message = ''
@@ -966,18 +1270,13 @@ def vcf_tsv_to_bed(
 
         # Pick records for this sample
         if len(gt_cols) > 0 and df.shape[0] > 0:
-            gt = df[gt_cols].fillna('.').apply(lambda row:
-                [val for val_list in row.astype(str).apply(lambda val: re.split('[|/]', val)) for val in val_list],
-                axis=1
-            )
+            gt = df[gt_cols[0]].fillna('.').astype(str).str.split(svpoplib.varbed.GT_SPLIT_RE)
 
-            gt_alt_set = gt.apply(set)
+            for gt_col in gt_cols[1:]:
+                gt += df[gt_col].fillna('.').astype(str).str.split(svpoplib.varbed.GT_SPLIT_RE)
 
             df = df.loc[
-                df.apply(lambda row:
-                    row['VCF_ALT_IDX'] in gt_alt_set.loc[row.name],
-                    axis=1
-                )
+                [alt_idx in val_list for alt_idx, val_list in zip(df['VCF_ALT_IDX'], gt)]
             ]
 
             # Compute AF
@@ -1018,15 +1317,21 @@ def vcf_tsv_to_bed(
         df['VCF_REF'] = df['VCF_REF'].fillna('').astype(str)
         df['VCF_ALT'] = df['VCF_ALT'].fillna('').astype(str)
 
-        df_var_fields = svpoplib.pd.apply_parallel(
-            df, vcf_fields_to_seq,
-            n_part=500, n_core=threads,
-            kwds={
-                'pos_row': 'VCF_POS',
-                'ref_row': 'VCF_REF',
-                'alt_row': 'VCF_ALT'
-            }
-        )
+        if threads > 1:
+            with multiprocessing.Pool(threads) as pool:
+                df_var_fields = pd.concat(
+                    pool.starmap(
+                        vcf_fields_to_seq_df,
+                        [
+                            (df.iloc[part_index], 'VCF_POS', 'VCF_REF', 'VCF_ALT')
+                            for part_index in np.array_split(np.arange(df.shape[0]), threads)
+                        ]
+                    ),
+                    axis=0
+                )
+
+        else:
+            df_var_fields = vcf_fields_to_seq_df(df, 'VCF_POS', 'VCF_REF', 'VCF_ALT')
 
         df = df[[col for col in df.columns if col not in df_var_fields.columns]]
 
@@ -1068,7 +1373,7 @@ def vcf_tsv_to_bed(
             raise RuntimeError(f'No header written, but the last dataframe is not empty: nrow={df.shape[0]} (bug?)')
 
         # Add required columns
-        for col in ['#CHROM', 'POS', 'END', 'ID', 'SVTYPE', 'SVLEN'] + list(vcf_fields_to_seq(None).index):
+        for col in ['#CHROM', 'POS', 'END', 'ID', 'SVTYPE', 'SVLEN'] + VCF_FIELDS_COLS:
             if col not in df.columns:
                 df[col] = []
 
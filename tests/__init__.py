@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Library dependencies (see Snakefile)
+SVPOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.append(SVPOP_DIR)
+sys.path.append(os.path.join(SVPOP_DIR, 'dep'))  # kanapy: K-mer toolkit
+sys.path.append(os.path.join(SVPOP_DIR, 'dep', 'ply'))  # ply: Python lex/yacc
@@ -0,0 +1,137 @@
+"""
+Tests for svpoplib.aligner.
+"""
+
+import random
+import unittest
+
+import numpy as np
+
+import svpoplib
+
+
+def mutate(rng, seq, n_edit):
+    """
+    Apply random substitutions, insertions, and deletions to a sequence.
+
+    :param rng: Random number generator.
+    :param seq: Sequence.
+    :param n_edit: Number of edits.
+
+    :return: Mutated sequence.
+    """
+
+    seq = list(seq)
+
+    for _ in range(n_edit):
+        pos = rng.randrange(len(seq))
+        edit = rng.choice(['sub', 'ins', 'del'])
+
+        if edit == 'sub':
+            seq[pos] = rng.choice('ACGT')
+        elif edit == 'ins':
+            seq[pos:pos] = rng.choices('ACGT', k=rng.randint(1, 6))
+        elif len(seq) > 1:
+            del seq[pos:pos + rng.randint(1, 6)]
+
+    return ''.join(seq)
+
+
+class TestScoreAlign(unittest.TestCase):
+
+    def test_score_align_matches_cell(self):
+        """
+        Scores for sequences aligned by anti-diagonals (ALIGN_DIAG_MIN_LEN or longer) match cell-by-cell scores,
+        including rotated (seq_b + seq_b) query sequences.
+        """
+
+        rng = random.Random(0)
+
+        for aligner in [
+            svpoplib.aligner.ScoreAligner(),
+            svpoplib.aligner.ScoreAligner(match=1.0, mismatch=-2.0, gap_open=-3.0, gap_extend=-0.5)
+        ]:
+            for trial in range(20):
+                len_a = svpoplib.aligner.ALIGN_DIAG_MIN_LEN + rng.randint(-3, 30)
+
+                seq_a = ''.join(rng.choices('ACGT', k=len_a))
+                seq_b = mutate(rng, seq_a, rng.randint(0, 20))
+
+                if trial % 2:
+                    # Rotate so seq_a aligns across the seq_b + seq_b junction
+                    rotate_pos = rng.randrange(len(seq_b))
+                    seq_b = seq_b[rotate_pos:] + seq_b[:rotate_pos]
+
+                for seq_query in (seq_b, seq_b + seq_b):
+                    with self.subTest(trial=trial, len_a=len(seq_a), len_b=len(seq_query)):
+                        self.assertEqual(
+                            aligner.score_align(seq_a, seq_query),
+                            aligner._ScoreAligner__score_align_cell(seq_a, seq_query)
+                        )
+
+
+class TestJaccardDistance(unittest.TestCase):
+
+    @staticmethod
+    def jaccard_distance_str(seq_a, seq_b, k_size):
+        """
+        Jaccard distance from k-mer strings (`get_kmer_count()`). Reference for packed k-mers.
+        """
+
+        count_a = svpoplib.aligner.get_kmer_count(seq_a, k_size)
+        count_b = svpoplib.aligner.get_kmer_count(seq_b, k_size)
+
+        key_set = set(count_a.keys()) | set(count_b.keys())
+
+        if len(count_a) == 0 or len(count_b) == 0:
+            return 0
+
+        return np.sum(
+            [np.min([count_a[key], count_b[key]]) for key in key_set]
+        ) / np.sum(
+            [np.max([count_a[key], count_b[key]]) for key in key_set]
+        )
+
+    def test_jaccard_distance_matches_kmer_count(self):
+        """
+        Jaccard distance with packed k-mers matches k-mer strings, including lowercase bases, N bases (not packed),
+        and sequences shorter than the k-mer size.
+        """
+
+        rng = random.Random(2)
+
+        seq_pair_list = list()
+
+        for _ in range(40):
+            seq_a = ''.join(rng.choices('ACGT', k=rng.randint(20, 80)))
+            seq_b = mutate(rng, seq_a, rng.randint(0, 10))
+
+            seq_pair_list.append((seq_a, seq_b))
+
+        seq_pair_list += [
+            (seq_a.lower(), seq_b) for seq_a, seq_b in seq_pair_list[:10]
+        ] + [
+            (seq_a[:10] + 'N' + seq_a[10:], seq_b) for seq_a, seq_b in seq_pair_list[10:20]
+        ] + [
+            (seq_a[:10] + 'n' + seq_a[10:].lower(), seq_b[:5] + 'NN' + seq_b[5:]) for seq_a, seq_b in seq_pair_list[20:30]
+        ] + [
+            ('AC', 'ACGTACGTACGT'), ('ACGTACGTACGT', 'ac'), ('AC', 'AC'), ('ACG', 'NNN'), (' acgtacgtac\n', 'ACGTACGTAC')
+        ]
+
+        for k_size in (3, 9):
+            for seq_a, seq_b in seq_pair_list:
+                with self.subTest(seq_a=seq_a, seq_b=seq_b, k_size=k_size):
+                    self.assertEqual(
+                        svpoplib.aligner.jaccard_distance(seq_a, seq_b, k_size),
+                        self.jaccard_distance_str(seq_a, seq_b, k_size)
+                    )
+
+    def test_kmer_code_count_unpacked_bases(self):
+        """
+        Sequences with bases other than A, C, G, and T (any case) are not packed.
+        """
+
+        self.assertIsNone(svpoplib.aligner.get_kmer_code_count('ACGTNACGT', 3))
+        self.assertIsNone(svpoplib.aligner.get_kmer_code_count('acgtnacgt', 3))
+        self.assertIsNone(svpoplib.aligner.get_kmer_code_count('ACGT-ACGT', 3))
+        self.assertIsNotNone(svpoplib.aligner.get_kmer_code_count('acgtacgt', 3))
@@ -0,0 +1,308 @@
+"""
+Tests for svpoplib.svmerge.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+import unittest.mock
+
+import numpy as np
+import pandas as pd
+
+import svpoplib
+
+try:
+    import intervaltree
+except ImportError:
+    intervaltree = None
+
+
+def make_sample(rng, n, shared=None):
+    """
+    Make a table of random INS/DEL variants on two chromosomes. Half of the variants are drawn from `shared` (if given)
+    with small changes in position and size.
+
+    :param rng: Random number generator.
+    :param n: Number of variants.
+    :param shared: List of variant records (dict) to draw variants from.
+
+    :return: Variant table sorted by "#CHROM" and "POS".
+    """
+
+    row_list = list()
+
+    for _ in range(n):
+        if shared and rng.random() < 0.5:
+            row = dict(rng.choice(shared))
+            row['POS'] = max(1, row['POS'] + rng.choice([0, 0, rng.randint(-100, 100)]))
+            row['SVLEN'] = max(50, row['SVLEN'] + rng.choice([0, rng.randint(-150, 150)]))
+
+        else:
+            row = {
+                '#CHROM': rng.choice(['chr1', 'chr2']),
+                'POS': rng.randint(1, 5000),
+                'SVTYPE': rng.choice(['INS', 'DEL']),
+                'SVLEN': rng.randint(50, 500)
+            }
+
+        row['END'] = row['POS'] + (1 if row['SVTYPE'] == 'INS' else row['SVLEN'])
+        row['ID'] = '{#CHROM}-{}-{SVTYPE}-{SVLEN}'.format(row['POS'] + 1, **row)
+
+        row_list.append(row)
+
+    df = pd.DataFrame(row_list).drop_duplicates('ID').sort_values(['#CHROM', 'POS']).reset_index(drop=True)
+
+    return df[['#CHROM', 'POS', 'END', 'ID', 'SVTYPE', 'SVLEN']]
+
+
+def cluster_record_pairs_intervaltree(df, df_next, base_interval_flank, offsz_max=None, ro_min=None):
+    """
+    Cluster records with an interval tree the way `get_support_table()` did before `get_cluster_record_pairs()`.
+    Reference for `get_cluster_record_pairs()`.
+    """
+
+    tree = intervaltree.IntervalTree()
+
+    for index, row in df.iterrows():
+        if offsz_max is not None:
+            interval_flank = max(base_interval_flank, row['SVLEN'] * offsz_max)
+        else:
+            interval_flank = base_interval_flank
+
+        tree.addi(
+            row['POS'] - interval_flank,
+            (row['END'] if row['SVTYPE'] != 'INS' else row['POS'] + 1) + interval_flank,
+            ({row['ID']}, set())
+        )
+
+    for index, row in df_next.iterrows():
+        pos = row['POS']
+        end = row['END'] if (row['SVTYPE'] != 'INS' or ro_min is None) else row['POS'] + row['SVLEN']
+
+        source_rows = set()
+        target_rows = {row['ID']}
+
+        pos_set = set()
+        end_set = set()
+
+        for interval in tree[pos:end]:
+            pos_set.add(interval.begin)
+            end_set.add(interval.end)
+
+            source_rows |= interval.data[0]
+            target_rows |= interval.data[1]
+
+            tree.discard(interval)
+
+        if source_rows:
+            tree.addi(min(pos_set), max(end_set), (source_rows, target_rows))
+
+    return [interval.data for interval in tree if len(interval.data[1]) > 0]
+
+
+def make_exact_sample(rng, n, seq_list):
+    """
+    Make a table of random variants with few distinct keys ("#CHROM", "POS", "SVLEN", "REF", "ALT") so that many
+    records share keys within and across tables.
+
+    :param rng: Random number generator.
+    :param n: Number of variants.
+    :param seq_list: List of sequences to draw variant sequences from (with random substitutions).
+
+    :return: Variant table with columns "#CHROM", "POS", "SVLEN", "REF", "ALT", "SEQ", and "ID".
+    """
+
+    row_list = list()
+
+    for index in range(n):
+        seq = rng.choice(seq_list)
+
+        if rng.random() < 0.5:
+            seq = ''.join(base if rng.random() < 0.9 else rng.choice('ACGT') for base in seq)
+
+        row_list.append({
+            '#CHROM': rng.choice(['chr1', 'chr2']),
+            'POS': rng.randint(1, 4),
+            'SVLEN': rng.choice([50, 51]),
+            'REF': rng.choice(['A', 'C']),
+            'ALT': rng.choice(['G', 'T']),
+            'SEQ': seq,
+            'ID': f'var{index}'
+        })
+
+    return pd.DataFrame(row_list)
+
+
+def support_table_exact_pairwise(df, df_next, key_cols, align_match_prop=None, aligner=None):
+    """
+    Match records by comparing key columns for each pair of records. Records in `df` are visited in table order and
+    each is matched to the first unmatched record in `df_next` with the same keys (or the first with the best sequence
+    match if `align_match_prop` is set). If sequences are matched, records with the same keys are visited in sequence
+    order. Reference for `get_support_table_exact()`.
+
+    :return: A list of (ID, TARGET_ID, MATCH) tuples sorted by ID.
+    """
+
+    if align_match_prop is not None:
+        df = df.sort_values('SEQ', kind='stable')
+        df_next = df_next.sort_values('SEQ', kind='stable')
+
+    # df_next records not yet matched (in order, best sequence matches are swapped with the first record for a key)
+    next_order = list(range(df_next.shape[0]))
+
+    match_list = list()
+
+    for index_1 in range(df.shape[0]):
+        row = df.iloc[index_1]
+
+        key_pos = [
+            pos for pos, index_2 in enumerate(next_order)
+                if all(row[col] == df_next.iloc[index_2][col] for col in key_cols)
+        ]
+
+        if not key_pos:
+            continue
+
+        if align_match_prop is None:
+            match_list.append((row['ID'], df_next.iloc[next_order[key_pos[0]]]['ID'], np.nan))
+            del next_order[key_pos[0]]
+            continue
+
+        prop_list = [aligner.match_prop(row['SEQ'], df_next.iloc[next_order[pos]]['SEQ']) for pos in key_pos]
+
+        max_pos = key_pos[int(np.argmax(prop_list))]
+
+        if np.max(prop_list) < align_match_prop:
+            continue
+
+        next_order[key_pos[0]], next_order[max_pos] = next_order[max_pos], next_order[key_pos[0]]
+
+        match_list.append((row['ID'], df_next.iloc[next_order[key_pos[0]]]['ID'], np.max(prop_list)))
+        del next_order[key_pos[0]]
+
+    return sorted(match_list)
+
+
+class TestSupportTableExact(unittest.TestCase):
+
+    def test_support_table_exact_matches_pairwise(self):
+        """
+        Exact matches are the same as matching records by comparing key columns for each pair of records, with and
+        without REF, ALT, and sequence matching.
+        """
+
+        aligner = svpoplib.aligner.ScoreAligner()
+
+        for seed in range(6):
+            rng = random.Random(seed)
+
+            seq_list = [''.join(rng.choices('ACGT', k=rng.randint(20, 40))) for _ in range(4)]
+
+            df = make_exact_sample(rng, 60, seq_list)
+            df_next = make_exact_sample(rng, 60, seq_list)
+
+            df_next['ID'] = 'next_' + df_next['ID']
+
+            for match_ref, match_alt, align_match_prop in [
+                (None, None, None), (False, False, None), (True, False, None), (False, True, None),
+                (False, False, 0.8), (True, True, 0.8)
+            ]:
+                with self.subTest(seed=seed, match_ref=match_ref, match_alt=match_alt, align_match_prop=align_match_prop):
+
+                    key_cols = ['#CHROM', 'POS', 'SVLEN'] + \
+                        (['REF'] if match_ref is not False else []) + \
+                        (['ALT'] if match_alt is not False else [])
+
+                    df_support = svpoplib.svmerge.get_support_table_exact(
+                        df, df_next, align_match_prop=align_match_prop, aligner=aligner,
+                        match_ref=match_ref, match_alt=match_alt
+                    )
+
+                    match_list = sorted(
+                        zip(df_support['ID'], df_support['TARGET_ID'], df_support['MATCH'])
+                    ) if df_support is not None else list()
+
+                    match_list_pairwise = support_table_exact_pairwise(
+                        df, df_next, key_cols, align_match_prop, aligner
+                    )
+
+                    self.assertTrue(len(match_list_pairwise) > 0)
+
+                    self.assertEqual(
+                        [(id_1, id_2) for id_1, id_2, _ in match_list],
+                        [(id_1, id_2) for id_1, id_2, _ in match_list_pairwise]
+                    )
+
+                    np.testing.assert_array_equal(
+                        [prop for _, _, prop in match_list],
+                        [prop for _, _, prop in match_list_pairwise]
+                    )
+
+
+@unittest.skipIf(intervaltree is None, 'intervaltree is not installed')
+class TestClusterRecordPairs(unittest.TestCase):
+
+    def test_cluster_matches_intervaltree(self):
+        """
+        Clusters are the same as the interval tree clusters.
+        """
+
+        for seed in range(8):
+            rng = random.Random(seed)
+
+            shared = make_sample(rng, 120).to_dict('records')
+
+            df = make_sample(rng, 120, shared)
+            df_next = make_sample(rng, 120, shared)
+
+            df = df.loc[df['#CHROM'] == 'chr1']
+            df_next = df_next.loc[df_next['#CHROM'] == 'chr1']
+
+            for base_interval_flank, offsz_max, ro_min in [(1, None, 0.5), (201, None, 0.5), (1, 2, None), (301, 2, 0.5)]:
+                with self.subTest(seed=seed, flank=base_interval_flank, offsz_max=offsz_max, ro_min=ro_min):
+                    self.assertEqual(
+                        sorted(
+                            (sorted(src_set), sorted(tgt_set)) for src_set, tgt_set in svpoplib.svmerge.get_cluster_record_pairs(
+                                df, df_next, base_interval_flank, offsz_max=offsz_max, ro_min=ro_min
+                            )
+                        ),
+                        sorted(
+                            (sorted(src_set), sorted(tgt_set)) for src_set, tgt_set in cluster_record_pairs_intervaltree(
+                                df, df_next, base_interval_flank, offsz_max=offsz_max, ro_min=ro_min
+                            )
+                        )
+                    )
+
+    def test_merge_matches_intervaltree(self):
+        """
+        Merged variants are the same as merging with interval tree clusters.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for seed in range(4):
+                rng = random.Random(seed)
+
+                shared = make_sample(rng, 120).to_dict('records')
+
+                bed_list = list()
+
+                for sample_index in range(4):
+                    bed_file_name = os.path.join(temp_dir, f'{seed}_{sample_index}.bed.gz')
+                    make_sample(rng, 120, shared).to_csv(bed_file_name, sep='\t', index=False)
+
+                    bed_list.append(bed_file_name)
+
+                sample_names = [f's{sample_index}' for sample_index in range(4)]
+
+                for strategy in ['nr::ro:szro', 'nr::exact:ro(0.5):szro(0.5,200)', 'nr::ro(0.5)', 'nr::szro(0.5,200,2)']:
+                    with self.subTest(seed=seed, strategy=strategy):
+                        df = svpoplib.svmerge.merge_variants(bed_list, sample_names, strategy)
+
+                        with unittest.mock.patch.object(
+                                svpoplib.svmerge, 'get_cluster_record_pairs', cluster_record_pairs_intervaltree
+                        ):
+                            df_tree = svpoplib.svmerge.merge_variants(bed_list, sample_names, strategy)
+
+                        pd.testing.assert_frame_equal(df, df_tree)
@@ -0,0 +1,39 @@
+"""
+Tests for svpoplib.varbed.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import svpoplib
+
+
+class TestGtHasAlt(unittest.TestCase):
+
+    def test_gt_has_alt_array_matches_gt_has_alt(self):
+        """
+        The vectorized genotype check agrees with the per-genotype check, including malformed genotypes.
+        """
+
+        gt = pd.Series(
+            [
+                '0/0', '0/1', '1/1', '1|2', '0|0', './.', '.', '1', '0', './1', '.|0', '2/3',
+                '01/0', '00/0', '+1/0', '-1/0', ' 1/0', '1 /0', '1_0/0', '0_0/0', '1__0/0', '_1/0', '1_/0',
+                '1.0/0', '0x1/0', '٣/0', '²/0', '', '/', '//1', 'a/b', '1/a', 'NA', None, np.nan
+            ],
+            index=[2, 2] + list(range(33))
+        )
+
+        self.assertEqual(
+            list(svpoplib.varbed.gt_has_alt_array(gt)),
+            [svpoplib.varbed.gt_has_alt(val) for val in gt]
+        )
+
+    def test_gt_has_alt_array_empty(self):
+        """
+        An empty genotype column returns an empty array.
+        """
+
+        self.assertEqual(len(svpoplib.varbed.gt_has_alt_array(pd.Series([], dtype=object))), 0)
@@ -0,0 +1,308 @@
+"""
+Tests for svpoplib.variant.
+"""
+
+import random
+import unittest
+
+import pandas as pd
+
+import svpoplib
+
+
+def make_sample(rng, n):
+    """
+    Make a table of random SNVs on several chromosomes.
+
+    :param rng: Random number generator.
+    :param n: Number of variants.
+
+    :return: Variant table sorted by "#CHROM" and "POS".
+    """
+
+    row_list = list()
+
+    for _ in range(n):
+        pos = rng.randint(1, 20000)
+        ref = rng.choice('ACGT')
+        alt = rng.choice([base for base in 'ACGT' if base != ref])
+
+        row_list.append({
+            '#CHROM': rng.choice(['chr1', 'chr2', 'chr10', 'chrX']),
+            'POS': pos,
+            'END': pos + 1,
+            'SVTYPE': 'SNV',
+            'SVLEN': 1,
+            'REF': ref,
+            'ALT': alt
+        })
+
+    df = pd.DataFrame(row_list)
+    df['ID'] = svpoplib.variant.get_variant_id(df)
+
+    return df.sort_values(['#CHROM', 'POS']).reset_index(drop=True)
+
+
+class TestVarNearest(unittest.TestCase):
+
+    def test_var_nearest_threads(self):
+        """
+        Matching chromosomes in parallel gives the same table as matching them serially.
+        """
+
+        rng = random.Random(0)
+
+        df_a = make_sample(rng, 400)
+        df_b = make_sample(rng, 400)
+
+        # Chromosome only in df_a (not matched)
+        df_a.loc[df_a.index[:10], '#CHROM'] = 'chr22'
+
+        for ref_alt in (False, True):
+            with self.subTest(ref_alt=ref_alt):
+                df_serial = svpoplib.variant.var_nearest(df_a, df_b, ref_alt=ref_alt, threads=1)
+                df_parallel = svpoplib.variant.var_nearest(df_a, df_b, ref_alt=ref_alt, threads=3)
+
+                self.assertGreater(df_serial.shape[0], 0)
+                pd.testing.assert_frame_equal(df_parallel, df_serial)
+
+
+class TestNrIntervalMerge(unittest.TestCase):
+
+    @staticmethod
+    def nr_interval_merge_pairwise(df_chr):
+        """
+        Drop a record if any earlier record in the table has a reciprocal overlap of at least 50%. Reference for
+        `nr_interval_merge()`.
+        """
+
+        pos = df_chr['POS'].tolist()
+        end = df_chr['END'].tolist()
+
+        return df_chr.loc[[
+            df_chr.index[index] for index in range(df_chr.shape[0])
+                if not any(
+                    svpoplib.variant.reciprocal_overlap(pos[index], end[index], pos[index_prev], end[index_prev]) >= 0.5
+                        for index_prev in range(index)
+                )
+        ]]
+
+    def test_nr_interval_merge_matches_pairwise(self):
+        """
+        Non-redundant records are the same as comparing each record with all records before it. Dense tables keep
+        more than `NR_MERGE_ARRAY_MIN` records active and compare them as arrays.
+        """
+
+        for seed in range(10):
+            rng = random.Random(seed)
+
+            for n, max_pos, max_len in [(300, 20000, 400), (300, 200, 50), (200, 20, 8)]:
+                with self.subTest(seed=seed, n=n, max_pos=max_pos, max_len=max_len):
+                    pos = [rng.randint(0, max_pos) for _ in range(n)]
+
+                    df_chr = pd.DataFrame({
+                        '#CHROM': 'chr1',
+                        'POS': pos,
+                        'END': [val + rng.randint(1, max_len) for val in pos]
+                    })
+
+                    # Unsorted table with a non-default index
+                    df_chr = df_chr.sample(frac=1, random_state=seed)
+                    df_chr.index = df_chr.index * 2 + 1
+
+                    pd.testing.assert_frame_equal(
+                        svpoplib.variant.nr_interval_merge(df_chr),
+                        self.nr_interval_merge_pairwise(df_chr)
+                    )
+
+    def test_nr_interval_merge_empty_interval(self):
+        """
+        Records with END <= POS are rejected.
+        """
+
+        with self.assertRaises(RuntimeError):
+            svpoplib.variant.nr_interval_merge(pd.DataFrame({'#CHROM': 'chr1', 'POS': [10, 20], 'END': [15, 20]}))
+
+
+def left_homology_base(pos_tig, seq_tig, seq_sv):
+    """
+    Compare bases one at a time. Reference for `left_homology()`.
+    """
+
+    hom_len = 0
+
+    while hom_len <= pos_tig:
+        seq_tig_base = seq_tig[pos_tig - hom_len]
+
+        if seq_tig_base not in {'A', 'C', 'G', 'T'} or seq_sv[-((hom_len + 1) % len(seq_sv))] != seq_tig_base:
+            break
+
+        hom_len += 1
+
+    return hom_len
+
+
+def right_homology_base(pos_tig, seq_tig, seq_sv):
+    """
+    Compare bases one at a time. Reference for `right_homology()`.
+    """
+
+    hom_len = 0
+
+    while hom_len < len(seq_tig) - pos_tig:
+        seq_tig_base = seq_tig[pos_tig + hom_len]
+
+        if seq_tig_base not in {'A', 'C', 'G', 'T'} or seq_sv[hom_len % len(seq_sv)] != seq_tig_base:
+            break
+
+        hom_len += 1
+
+    return hom_len
+
+
+class TestHomology(unittest.TestCase):
+
+    def assert_homology_equal(self, homology_func, homology_func_base, pos_tig, seq_tig, seq_sv):
+        """
+        Check that a homology function returns the same value or raises the same exception as a reference.
+        """
+
+        try:
+            hom_len_base = homology_func_base(pos_tig, seq_tig, seq_sv)
+
+        except (IndexError, ZeroDivisionError) as ex:
+            with self.assertRaises(type(ex)):
+                homology_func(pos_tig, seq_tig, seq_sv)
+
+            return
+
+        self.assertEqual(homology_func(pos_tig, seq_tig, seq_sv), hom_len_base)
+
+    def test_homology_matches_base(self):
+        """
+        Homology is the same as comparing bases one at a time, including homology wrapping through the SV sequence,
+        ambiguous contig bases, lowercase and N bases in the SV sequence, and positions at or beyond contig edges.
+        """
+
+        rng = random.Random(0)
+
+        for _ in range(300):
+            seq_sv = ''.join(rng.choices('ACGT', k=rng.randint(1, 12)))
+
+            # Tandem copies of the SV sequence flanked by random sequence (long homology wraps through seq_sv)
+            seq_tig = list(
+                ''.join(rng.choices('ACGT', k=rng.randint(0, 20))) +
+                seq_sv * rng.randint(0, 80 // len(seq_sv)) + seq_sv[:rng.randint(0, len(seq_sv))] +
+                ''.join(rng.choices('ACGT', k=rng.randint(0, 20)))
+            )
+
+            for _ in range(rng.choice([0, 0, 1, 3])):
+                if seq_tig:
+                    seq_tig[rng.randrange(len(seq_tig))] = rng.choice('ACGTNRacgtn')
+
+            seq_tig = ''.join(seq_tig)
+
+            seq_sv_list = [seq_sv, seq_sv.lower(), seq_sv[:-1] + 'N', 'N' + seq_sv[1:], seq_sv[::-1]]
+
+            for seq_sv_test in seq_sv_list:
+                tig_len = len(seq_tig)
+
+                for pos_tig in sorted({-2, -1, 0, 1, tig_len // 2, tig_len - 1, tig_len, tig_len + 2}):
+                    with self.subTest(pos_tig=pos_tig, seq_tig=seq_tig, seq_sv=seq_sv_test):
+                        self.assert_homology_equal(
+                            svpoplib.variant.left_homology, left_homology_base, pos_tig, seq_tig, seq_sv_test
+                        )
+
+                        self.assert_homology_equal(
+                            svpoplib.variant.right_homology, right_homology_base, pos_tig, seq_tig, seq_sv_test
+                        )
+
+    def test_homology_none_and_empty(self):
+        """
+        Missing sequences have no homology, and an empty SV sequence fails as it does when comparing bases.
+        """
+
+        for homology_func in (svpoplib.variant.left_homology, svpoplib.variant.right_homology):
+            self.assertEqual(homology_func(3, None, 'ACGT'), 0)
+            self.assertEqual(homology_func(3, 'ACGTACGT', None), 0)
+
+        self.assert_homology_equal(svpoplib.variant.left_homology, left_homology_base, 3, 'ACGTACGT', '')
+        self.assert_homology_equal(svpoplib.variant.right_homology, right_homology_base, 3, 'ACGTACGT', '')
+
+    def test_first_mismatch(self):
+        """
+        The first mismatch is found at every position, for sequences shorter and longer than the base-by-base limit.
+        """
+
+        rng = random.Random(1)
+
+        for seq_len in (1, 2, 8, 9, 16, 17, 100):
+            seq_a = ''.join(rng.choices('ACGT', k=seq_len))
+
+            for index in range(seq_len):
+                seq_b = seq_a[:index] + ('A' if seq_a[index] != 'A' else 'C') + seq_a[index + 1:]
+
+                with self.subTest(seq_len=seq_len, index=index):
+                    self.assertEqual(svpoplib.variant._first_mismatch(seq_a, seq_b), index)
+
+                    # Later mismatches do not change the first mismatch
+                    self.assertEqual(
+                        svpoplib.variant._first_mismatch(seq_a, seq_b[:index + 1] + seq_a[index + 1:][::-1]), index
+                    )
+
+
+class TestVersionId(unittest.TestCase):
+
+    def assert_version_id(self, id_list, id_list_exp, existing_id_set=None):
+        """
+        Check versioned IDs. The index and name of the ID column are kept.
+        """
+
+        id_col = pd.Series(id_list, index=[index * 2 + 1 for index in range(len(id_list))], name='ID')
+
+        pd.testing.assert_series_equal(
+            svpoplib.variant.version_id(id_col, existing_id_set),
+            pd.Series(id_list_exp, index=id_col.index, name='ID')
+        )
+
+    def test_unique_ids(self):
+        """
+        Unique IDs are returned unchanged.
+        """
+
+        id_col = pd.Series(['a', 'b', 'a.1', 'b.x'])
+
+        self.assertIs(svpoplib.variant.version_id(id_col), id_col)
+        self.assertIs(svpoplib.variant.version_id(id_col, {'c', 'a.2'}), id_col)
+
+    def test_duplicate_ids(self):
+        """
+        Duplicate IDs are versioned in table order.
+        """
+
+        self.assert_version_id(['a', 'b', 'a', 'a'], ['a.1', 'b', 'a.2', 'a.3'])
+
+    def test_versioned_ids(self):
+        """
+        Duplicate IDs with a version suffix (".N") are versioned after that version.
+        """
+
+        self.assert_version_id(['a.1', 'a.1', 'b'], ['a.2', 'a.3', 'b'])
+        self.assert_version_id(['c.03', 'c.03', '.5', '.5'], ['c.4', 'c.5', '.6', '.7'])
+
+    def test_version_collisions(self):
+        """
+        Versions already in the table or in `existing_id_set` are skipped.
+        """
+
+        self.assert_version_id(['a', 'a', 'a.1'], ['a.2', 'a.3', 'a.1'])
+        self.assert_version_id(['a', 'b'], ['a.2', 'b'], {'a', 'a.1'})
+        self.assert_version_id(['a', 'a.2', 'a.2'], ['a', 'a.4', 'a.5'], {'a.3'})
+
+    def test_non_version_suffix(self):
+        """
+        Suffixes that are not an integer after the last "." are not parsed as versions.
+        """
+
+        self.assert_version_id(['b.x', 'b.x', 'x.', 'x.'], ['b.x.1', 'b.x.2', 'x..1', 'x..2'])
+        self.assert_version_id(['a.b.3', 'a.b.3', 'a.1x', 'a.1x'], ['a.b.4', 'a.b.5', 'a.1x.1', 'a.1x.2'])